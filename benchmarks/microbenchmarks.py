@@ -0,0 +1,247 @@
+"""
+Microbenchmarks of the image statistics and reprojection utilities run on every self-calibration iteration.
+
+Synthetic restored, residual and mask images are generated for every image size and each utility is timed. The
+throughput in megapixels per second and the peak of the Python and NumPy allocations traced by tracemalloc are
+reported. Allocations made by the CASA image tool in C++ are not visible to tracemalloc.
+
+Usage:
+    python benchmarks/microbenchmarks.py --sizes 512 1024 2048 4096 --output microbenchmarks.json
+    python benchmarks/microbenchmarks.py --sizes 8192 16384 --repeat 1
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from astropy.io import fits
+from casatools import image
+
+from snow.utils.image_utils import (
+    calculate_psnr_fits, calculate_psnr_ms, clear_reproject_cache, nanrms, reproject
+)
+
+# Pixel size of the synthetic images in degrees and of the mask that is reprojected onto them
+CELL = 1.0 / 3600.0
+MASK_CELL = 1.5 / 3600.0
+
+
+def _header(size: int = 512, cell: float = CELL) -> fits.Header:
+    """
+    Function that returns a celestial FITS header of a square image
+
+    Parameters
+    ----------
+    size :
+        Number of pixels per axis
+    cell :
+        Pixel size in degrees
+
+    Returns
+    -------
+    The FITS header
+    """
+    header = fits.Header()
+    header["NAXIS"] = 2
+    header["NAXIS1"] = size
+    header["NAXIS2"] = size
+    header["CTYPE1"] = "RA---SIN"
+    header["CTYPE2"] = "DEC--SIN"
+    header["CRPIX1"] = size // 2 + 1
+    header["CRPIX2"] = size // 2 + 1
+    header["CRVAL1"] = 299.868
+    header["CRVAL2"] = 40.734
+    header["CDELT1"] = -cell
+    header["CDELT2"] = cell
+    header["CUNIT1"] = "deg"
+    header["CUNIT2"] = "deg"
+    header["BUNIT"] = "Jy/beam"
+    return header
+
+
+def make_images(work_dir: str = "", size: int = 512, seed: int = 0) -> dict:
+    """
+    Function that writes a synthetic restored, residual and mask FITS image and the restored and residual CASA
+    images of a given size
+
+    Parameters
+    ----------
+    work_dir :
+        Absolute path to the output directory
+    size :
+        Number of pixels per axis
+    seed :
+        Seed of the random number generator
+
+    Returns
+    -------
+    dict:
+        A dictionary with the absolute paths to the images
+    """
+    rng = np.random.default_rng(seed)
+    residual = rng.standard_normal((size, size), dtype=np.float32) * np.float32(1.0e-4)
+    restored = residual.copy()
+    restored[size // 2 - 2:size // 2 + 3, size // 2 - 2:size // 2 + 3] += np.float32(1.0)
+    # A few blanked pixels, as in primary beam corrected images
+    residual[0:4, 0:4] = np.nan
+
+    paths = {
+        "restored_fits": os.path.join(work_dir, "restored_{0}.fits".format(size)),
+        "residual_fits": os.path.join(work_dir, "residual_{0}.fits".format(size)),
+        "mask_fits": os.path.join(work_dir, "mask_{0}.fits".format(size)),
+        "restored_image": os.path.join(work_dir, "restored_{0}.image".format(size)),
+        "residual_image": os.path.join(work_dir, "residual_{0}.image".format(size))
+    }
+    fits.writeto(paths["restored_fits"], restored, _header(size), overwrite=True)
+    fits.writeto(paths["residual_fits"], residual, _header(size), overwrite=True)
+
+    mask_size = max(int(size * CELL / MASK_CELL), 2)
+    mask = np.zeros((mask_size, mask_size), dtype=np.float32)
+    mask[mask_size // 4:3 * mask_size // 4, mask_size // 4:3 * mask_size // 4] = 1.0
+    fits.writeto(paths["mask_fits"], mask, _header(mask_size, MASK_CELL), overwrite=True)
+
+    ia = image()
+    for key, data in (("restored_image", restored), ("residual_image", residual)):
+        ia.fromarray(outfile=paths[key], pixels=np.nan_to_num(data), overwrite=True)
+        ia.close()
+    return paths
+
+
+def measure(function, repeat: int = 3) -> dict:
+    """
+    Function that times a function and traces its peak memory allocation
+
+    Parameters
+    ----------
+    function :
+        Function without arguments to measure
+    repeat :
+        Number of timed runs. The best time is kept
+
+    Returns
+    -------
+    dict:
+        A dictionary with the best time in seconds and the peak traced allocation in bytes
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"time": min(times), "peak_allocation": peak}
+
+
+def run_size(work_dir: str = "", size: int = 512, repeat: int = 3) -> dict:
+    """
+    Function that benchmarks every utility on images of a given size
+
+    Parameters
+    ----------
+    work_dir :
+        Absolute path to the directory of the synthetic images
+    size :
+        Number of pixels per axis
+    repeat :
+        Number of timed runs of each utility
+
+    Returns
+    -------
+    dict:
+        A dictionary with the measurements of each utility
+    """
+    paths = make_images(work_dir, size)
+    residual = fits.getdata(paths["residual_fits"])
+
+    cases = {
+        "nanrms": lambda: nanrms(residual),
+        "calculate_psnr_fits": lambda: calculate_psnr_fits(
+            paths["restored_fits"], paths["residual_fits"]
+        ),
+        "reproject": lambda: (
+            clear_reproject_cache(), reproject(paths["mask_fits"], paths["restored_fits"])
+        ),
+        "reproject_cached": lambda: reproject(paths["mask_fits"], paths["restored_fits"]),
+        "calculate_psnr_ms": lambda: calculate_psnr_ms(
+            paths["restored_image"], paths["residual_image"]
+        )
+    }
+
+    results = {}
+    for name, function in cases.items():
+        print("Measuring {0} on {1}x{1} pixels".format(name, size))
+        results[name] = measure(function, repeat)
+        results[name]["throughput"] = size * size / results[name]["time"] / 1.0e6
+    return results
+
+
+def report(results: dict = None) -> str:
+    """
+    Function that returns a human-readable table of the results
+
+    Parameters
+    ----------
+    results :
+        Measurements of each image size and utility
+
+    Returns
+    -------
+    str:
+        The table as a string
+    """
+    lines = [
+        "{0:<22} {1:>7} {2:>12} {3:>14} {4:>16}".format(
+            "Utility", "Size", "Time [s]", "Rate [MPix/s]", "Allocated [MB]"
+        )
+    ]
+    for size, utilities in results.items():
+        for name, measurement in utilities.items():
+            lines.append(
+                "{0:<22} {1:>7} {2:>12.4f} {3:>14.2f} {4:>16.1f}".format(
+                    name, size, measurement["time"], measurement["throughput"],
+                    measurement["peak_allocation"] / 1024.0**2
+                )
+            )
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the image statistics and reprojection utilities"
+    )
+    parser.add_argument("--sizes", nargs="+", type=int, default=[512, 1024, 2048, 4096])
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs")
+    parser.add_argument("--work-dir", default="microbenchmark_work", help="Directory for images")
+    parser.add_argument("--output", default=None, help="Output JSON file")
+    parser.add_argument(
+        "--keep-images", action="store_true", help="Do not delete the synthetic images"
+    )
+    args = parser.parse_args()
+
+    work_dir = os.path.abspath(args.work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+    results = {}
+    try:
+        for size in args.sizes:
+            results[str(size)] = run_size(work_dir, size, args.repeat)
+    finally:
+        if not args.keep_images:
+            shutil.rmtree(work_dir)
+
+    print(report(results))
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""
+End-to-end benchmarks of the self-calibration classes on simulated measurement sets.
+
+Each case self-calibrates a simulated measurement set with Tclean in its own process and records the time, CPU time
+and bytes written of every stage, the peak memory and the final PSNR. Results can be saved as a baseline and later
+runs are compared against it to flag regressions.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes small medium --output results.json --save-baseline baseline.json
+    python benchmarks/run_benchmarks.py --sizes small medium --output results.json --baseline baseline.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+
+from simulate import SIZES, simulate_ms
+
+# Calibrators benchmarked and the stages that run for each one.
+# Ampcal and AmpPhasecal need phase solutions first
+CALIBRATORS = {
+    "Phasecal": [("Phasecal", ["inf", "60s"])],
+    "Ampcal": [("Phasecal", ["inf"]), ("Ampcal", ["inf"])],
+    "AmpPhasecal": [("Phasecal", ["inf"]), ("AmpPhasecal", ["inf"])]
+}
+
+# Image size of each dataset size
+IMAGE_SIZES = {"small": 256, "medium": 512, "large": 1024}
+
+# Metrics compared against the baseline and whether larger values are better
+METRICS = {
+    "wall_time": False,
+    "cpu_time": False,
+    "peak_memory": False,
+    "bytes_written": False,
+    "psnr": True
+}
+
+
+def run_case(
+    ms_name: str = "", size: str = "small", calibrator: str = "Phasecal", work_dir: str = ""
+) -> dict:
+    """
+    Function that self-calibrates a copy of a simulated measurement set. It is executed inside a fresh process so
+    the peak memory only accounts for this case.
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the simulated measurement set
+    size :
+        Size of the simulated measurement set
+    calibrator :
+        Name of the benchmarked calibrator
+    work_dir :
+        Absolute path to the directory of this case
+
+    Returns
+    -------
+    dict:
+        A dictionary with the metrics of the case
+    """
+    from snow.imaging import Tclean
+    from snow.selfcalibration import Ampcal, AmpPhasecal, Phasecal, Pipeline
+    from snow.utils import Tracer, snapshot_ms
+
+    classes = {"Phasecal": Phasecal, "Ampcal": Ampcal, "AmpPhasecal": AmpPhasecal}
+
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    os.makedirs(work_dir)
+    visfile = os.path.join(work_dir, "benchmark.ms")
+    snapshot_ms(ms_name, visfile)
+
+    tracer = Tracer()
+    stages = []
+    for k, (stage_name, solint) in enumerate(CALIBRATORS[calibrator]):
+        imager = Tclean(
+            inputvis=visfile,
+            output=os.path.join(work_dir, "image_stage" + str(k)),
+            cell="1arcsec",
+            M=IMAGE_SIZES[size],
+            N=IMAGE_SIZES[size],
+            niter=100,
+            robust=0.5,
+            specmode="mfs",
+            verbose=False
+        )
+        stages.append(
+            classes[stage_name](
+                visfile=visfile,
+                imager=imager,
+                refant="A00",
+                solint=solint,
+                minsnr=2.0,
+                want_plot=False,
+                output_caltables=os.path.join(work_dir, "stage" + str(k) + "_")
+            )
+        )
+
+    with tracer.span("total"):
+        last_stage = Pipeline(stages).run()
+
+    stage_summary = {}
+    for stage in stages:
+        for name, summary in stage._tracer.summary().items():
+            aggregated = stage_summary.setdefault(
+                name, {
+                    "calls": 0,
+                    "wall_time": 0.0,
+                    "cpu_time": 0.0,
+                    "bytes_written": 0
+                }
+            )
+            for key in aggregated:
+                aggregated[key] += summary[key]
+
+    total = tracer.spans[-1]
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        "wall_time": total.wall_time,
+        "cpu_time": total.cpu_time,
+        "bytes_written": total.bytes_written,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_memory": usage.ru_maxrss * 1024,
+        "psnr": last_stage.imager.psnr,
+        "stages": stage_summary
+    }
+
+
+def compare(results: dict = None, baseline: dict = None, tolerance: float = 0.2) -> list:
+    """
+    Function that compares the results of a run against a baseline
+
+    Parameters
+    ----------
+    results :
+        Results of the current run
+    baseline :
+        Results of the baseline run
+    tolerance :
+        Relative change above which a metric is flagged as a regression
+
+    Returns
+    -------
+    list:
+        A list with a message for each regression
+    """
+    regressions = []
+    for case, metrics in results["cases"].items():
+        if case not in baseline["cases"]:
+            continue
+        reference = baseline["cases"][case]
+        for metric, larger_is_better in METRICS.items():
+            if not reference.get(metric):
+                continue
+            change = (metrics[metric] - reference[metric]) / abs(reference[metric])
+            if larger_is_better:
+                regressed = change < -tolerance
+            else:
+                regressed = change > tolerance
+            if regressed:
+                regressions.append(
+                    "{0}: {1} changed {2:+0.1f}% ({3:0.4g} -> {4:0.4g})".format(
+                        case, metric, 100.0 * change, reference[metric], metrics[metric]
+                    )
+                )
+    return regressions
+
+
+def report(results: dict = None) -> str:
+    """
+    Function that returns a human-readable table of the results
+
+    Parameters
+    ----------
+    results :
+        Results of a run
+
+    Returns
+    -------
+    str:
+        The table as a string
+    """
+    lines = [
+        "{0:<22} {1:>10} {2:>10} {3:>12} {4:>12} {5:>8}".format(
+            "Case", "Wall [s]", "CPU [s]", "Memory [MB]", "Written [MB]", "PSNR"
+        )
+    ]
+    for case, metrics in results["cases"].items():
+        lines.append(
+            "{0:<22} {1:>10.2f} {2:>10.2f} {3:>12.1f} {4:>12.1f} {5:>8.2f}".format(
+                case, metrics["wall_time"], metrics["cpu_time"],
+                metrics["peak_memory"] / 1024.0**2, metrics["bytes_written"] / 1024.0**2,
+                metrics["psnr"]
+            )
+        )
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark self-calibration on simulated measurement sets"
+    )
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=list(SIZES))
+    parser.add_argument(
+        "--calibrators", nargs="+", default=list(CALIBRATORS), choices=list(CALIBRATORS)
+    )
+    parser.add_argument(
+        "--work-dir", default="benchmark_work", help="Directory for datasets and products"
+    )
+    parser.add_argument("--output", default="benchmark_results.json", help="Output JSON file")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON file to compare against")
+    parser.add_argument(
+        "--save-baseline", default=None, help="Also write the results to this baseline file"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Relative change flagged as a regression"
+    )
+    args = parser.parse_args()
+
+    work_dir = os.path.abspath(args.work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        snow_version = version("snow")
+    except PackageNotFoundError:
+        snow_version = "unknown"
+
+    results = {
+        "version": snow_version,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "cases": {}
+    }
+    for size in args.sizes:
+        ms_name = simulate_ms(os.path.join(work_dir, "simulated_" + size + ".ms"), size)
+        for calibrator in args.calibrators:
+            case = size + "/" + calibrator
+            print("Running {0}".format(case))
+            with ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                results["cases"][case] = executor.submit(
+                    run_case, ms_name, size, calibrator,
+                    os.path.join(work_dir, size + "_" + calibrator)
+                ).result()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline is not None:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    print(report(results))
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        print("Compared against snow {0}".format(baseline.get("version", "unknown")))
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import os
+import shutil
+
+import numpy as np
+from casatools import componentlist, measures, simulator
+
+# Synthetic datasets: number of antennas, observation length in hours, integration time,
+# number of spectral windows and channels per spectral window
+SIZES = {
+    "small": {
+        "nantennas": 8,
+        "hours": 1.0,
+        "integration": "30s",
+        "nspw": 1,
+        "nchan": 8
+    },
+    "medium": {
+        "nantennas": 16,
+        "hours": 2.0,
+        "integration": "10s",
+        "nspw": 2,
+        "nchan": 32
+    },
+    "large": {
+        "nantennas": 27,
+        "hours": 4.0,
+        "integration": "5s",
+        "nspw": 4,
+        "nchan": 64
+    }
+}
+
+# Point sources of the sky model as offsets in arcseconds from the phase center and flux in Jy
+SOURCES = [(0.0, 0.0, 1.0), (12.0, -8.0, 0.2), (-20.0, 15.0, 0.05)]
+
+PHASE_CENTER = ("J2000", "19h59m28.5s", "+40d44m02.0s")
+REFERENCE_FREQUENCY = 6.0e9
+CHANNEL_WIDTH = 2.0e6
+
+
+def _antenna_positions(nantennas: int = 8, seed: int = 0) -> tuple:
+    """
+    Function that returns random antenna positions in local coordinates around the array center
+
+    Parameters
+    ----------
+    nantennas :
+        Number of antennas
+    seed :
+        Seed of the random number generator
+
+    Returns
+    -------
+    A tuple with the x, y and z positions in meters
+    """
+    rng = np.random.default_rng(seed)
+    radius = 3000.0 * np.sqrt(rng.uniform(0.0, 1.0, nantennas))
+    angle = rng.uniform(0.0, 2.0 * np.pi, nantennas)
+    return radius * np.cos(angle), radius * np.sin(angle), np.zeros(nantennas)
+
+
+def _component_list(path: str = "") -> str:
+    """
+    Function that writes the sky model of the benchmark as a CASA component list
+
+    Parameters
+    ----------
+    path :
+        Absolute path to the output component list
+
+    Returns
+    -------
+    str:
+        The absolute path to the component list
+    """
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    me = measures()
+    cl = componentlist()
+    center = me.direction(*PHASE_CENTER)
+    for dx, dy, flux in SOURCES:
+        direction = me.shift(
+            center, offset={
+                "value": np.hypot(dx, dy),
+                "unit": "arcsec"
+            }, pa={
+                "value": np.arctan2(dx, dy),
+                "unit": "rad"
+            }
+        )
+        cl.addcomponent(
+            dir=direction,
+            flux=flux,
+            fluxunit="Jy",
+            freq="{0}Hz".format(REFERENCE_FREQUENCY),
+            shape="point"
+        )
+    cl.rename(path)
+    cl.close()
+    return path
+
+
+def simulate_ms(
+    ms_name: str = "",
+    size: str = "small",
+    amplitude_error: float = 0.05,
+    phase_error: float = 0.3,
+    noise: str = "0.05Jy",
+    seed: int = 0,
+    overwrite: bool = False
+) -> str:
+    """
+    Function that simulates a measurement set of a point source field with antenna based phase and amplitude errors
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the output measurement set
+    size :
+        Size of the dataset: "small", "medium" or "large"
+    amplitude_error :
+        RMS of the real part of the fractional Brownian motion antenna gain errors, which for small errors is the
+        fractional amplitude error
+    phase_error :
+        RMS of the imaginary part of the fractional Brownian motion antenna gain errors, which for small errors is
+        the phase error in radians
+    noise :
+        Thermal noise per visibility
+    seed :
+        Seed used for the antenna layout and the corruptions
+    overwrite :
+        Whether to simulate the measurement set again if it already exists
+
+    Returns
+    -------
+    str:
+        The absolute path to the measurement set
+    """
+    if size not in SIZES:
+        raise ValueError("Size {0} is not supported".format(size))
+    if os.path.exists(ms_name):
+        if not overwrite:
+            return ms_name
+        shutil.rmtree(ms_name)
+
+    config = SIZES[size]
+    me = measures()
+    sm = simulator()
+    x, y, z = _antenna_positions(config["nantennas"], seed)
+
+    sm.open(ms_name)
+    sm.setconfig(
+        telescopename="VLA",
+        x=x,
+        y=y,
+        z=z,
+        dishdiameter=[25.0] * config["nantennas"],
+        mount=["alt-az"] * config["nantennas"],
+        antname=["A{0:02d}".format(i) for i in range(config["nantennas"])],
+        coordsystem="local",
+        referencelocation=me.observatory("VLA")
+    )
+    for spw in range(config["nspw"]):
+        sm.setspwindow(
+            spwname="spw{0}".format(spw),
+            freq="{0}Hz".format(REFERENCE_FREQUENCY + spw * config["nchan"] * CHANNEL_WIDTH),
+            deltafreq="{0}Hz".format(CHANNEL_WIDTH),
+            freqresolution="{0}Hz".format(CHANNEL_WIDTH),
+            nchannels=config["nchan"],
+            stokes="RR LL"
+        )
+    sm.setfeed(mode="perfect R L")
+    sm.setfield(sourcename="benchmark", sourcedirection=me.direction(*PHASE_CENTER))
+    sm.setlimits(shadowlimit=0.001, elevationlimit="8.0deg")
+    sm.setauto(autocorrwt=0.0)
+    sm.settimes(
+        integrationtime=config["integration"],
+        usehourangle=True,
+        referencetime=me.epoch("UTC", "2024/01/01/00:00:00")
+    )
+    half_length = "{0}h".format(config["hours"] / 2.0)
+    for spw in range(config["nspw"]):
+        sm.observe(
+            sourcename="benchmark",
+            spwname="spw{0}".format(spw),
+            starttime="-" + half_length,
+            stoptime=half_length
+        )
+
+    complist = _component_list(ms_name + ".cl")
+    sm.predict(complist=complist)
+
+    sm.setseed(seed)
+    sm.setgain(mode="fbm", interval="60s", amplitude=[amplitude_error, phase_error])
+    sm.setnoise(mode="simplenoise", simplenoise=noise)
+    sm.corrupt()
+    sm.close()
+    shutil.rmtree(complist)
+    return ms_name
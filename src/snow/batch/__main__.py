@@ -0,0 +1,35 @@
+import argparse
+import json
+import sys
+import time
+
+from .runner import BatchRunner, run_job
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog="python -m snow.batch", description="Self-calibrate the jobs of a manifest"
+    )
+    parser.add_argument("manifest", nargs="?", help="JSON manifest with the jobs to run")
+    parser.add_argument("-j", "--max-workers", type=int, default=1, help="Concurrent jobs")
+    parser.add_argument("-o", "--output-dir", default="batch", help="Logs and results directory")
+    parser.add_argument("--job", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.job is not None:
+        # Worker mode: run a single job in this process
+        with open(args.job, "r") as f:
+            job = json.load(f)
+        start = time.perf_counter()
+        result = run_job(job)
+        result["runtime"] = time.perf_counter() - start
+        with open(args.result, "w") as f:
+            json.dump(result, f, indent=2)
+    elif args.manifest is not None:
+        results = BatchRunner(
+            manifest=args.manifest, max_workers=args.max_workers, output_dir=args.output_dir
+        ).run()
+        sys.exit(0 if all(row["status"] == "done" for row in results) else 1)
+    else:
+        parser.print_usage()
+        sys.exit(2)
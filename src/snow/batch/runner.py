@@ -0,0 +1,221 @@
+import copy
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from ..imaging import GPUvmem, Tclean, WSClean
+from ..selfcalibration import Ampcal, AmpPhasecal, Phasecal, Pipeline
+
+_IMAGERS = {"Tclean": Tclean, "WSClean": WSClean, "GPUvmem": GPUvmem}
+_SELFCALS = {"Phasecal": Phasecal, "Ampcal": Ampcal, "AmpPhasecal": AmpPhasecal}
+
+
+def _build_object(config: dict = None, registry: dict = None, **kwargs):
+    """
+    Function that creates an object from a manifest configuration with a "type" key
+
+    Parameters
+    ----------
+    config :
+        Dictionary with the type name and the constructor arguments
+    registry :
+        Dictionary that maps type names to classes
+    kwargs :
+        Extra constructor arguments that take precedence over the configuration
+
+    Returns
+    -------
+    The new object
+    """
+    arguments = copy.deepcopy(config)
+    type_name = arguments.pop("type")
+    if type_name not in registry:
+        raise ValueError("Type {0} is not supported by the batch runner".format(type_name))
+    arguments.update(kwargs)
+    return registry[type_name](**arguments)
+
+
+def run_job(job: dict = None) -> dict:
+    """
+    Function that runs the self-calibration stages of a single job in the current process
+
+    Parameters
+    ----------
+    job :
+        Dictionary with the job "name", "visfile", optional "field", the "imager" configuration, the list of
+        "stages" configurations and optional selfcal_output arguments under "output"
+
+    Returns
+    -------
+    dict:
+        A dictionary with the final PSNR, the calibration tables and the output measurement set
+    """
+    field = job.get("field", "")
+    stages = []
+    for stage_config in job["stages"]:
+        stage_config = copy.deepcopy(stage_config)
+        imager_config = stage_config.pop("imager", job["imager"])
+        imager = _build_object(
+            imager_config, _IMAGERS, inputvis=job["visfile"], field=field
+        )
+        stages.append(
+            _build_object(
+                stage_config, _SELFCALS, visfile=job["visfile"], field=field, imager=imager
+            )
+        )
+
+    pipeline = Pipeline(stages=stages)
+    pipeline.run(resume=job.get("resume", False))
+
+    output_visfile = None
+    if job.get("output") is not None:
+        output_visfile = pipeline.selfcal_output(**job["output"])
+
+    return {
+        "psnr": pipeline.psnr_history[-1] if pipeline.psnr_history else None,
+        "psnr_history": pipeline.psnr_history,
+        "caltables": [caltable for stage in stages for caltable in stage._caltables],
+        "visfile": pipeline.visfile,
+        "output_visfile": output_visfile
+    }
+
+
+@dataclass(init=True, repr=True)
+class BatchRunner:
+    """
+    Runner that self-calibrates many targets. Each job runs in its own Python process, since CASA is not
+    thread-safe, with at most max_workers jobs running at the same time. A failing job does not stop the others.
+
+    Parameters
+    ----------
+    manifest :
+        Absolute path to a JSON manifest with a "jobs" list. Each job is a dictionary with a unique "name", the
+        "visfile", optional "field", the "imager" configuration (e.g. {"type": "Tclean", "output": ..., ...}), the
+        ordered list of "stages" (e.g. [{"type": "Phasecal", "solint": ["inf"], ...}]) and optional selfcal_output
+        arguments under "output". A stage may have its own "imager" configuration. Jobs can also set a working
+        directory "workdir" and "resume" to resume their stages from the last checkpoints
+    max_workers :
+        Maximum number of jobs running at the same time
+    output_dir :
+        Absolute path to the directory for the job logs and the results table
+    """
+    manifest: str = ""
+    max_workers: int = 1
+    output_dir: str = "batch"
+
+    def _load_jobs(self) -> list:
+        with open(self.manifest, "r") as f:
+            jobs = json.load(f)["jobs"]
+        names = [job["name"] for job in jobs]
+        if len(set(names)) != len(names):
+            raise ValueError("Error, the job names of the manifest must be unique")
+        return jobs
+
+    def _run_worker(self, job: dict = None) -> dict:
+        """
+        Method that runs a job in a new process and waits until it finishes
+
+        Parameters
+        ----------
+        job :
+            Job dictionary of the manifest
+
+        Returns
+        -------
+        dict:
+            The row of the results table for this job
+        """
+        output_dir = os.path.abspath(self.output_dir)
+        job_file = os.path.join(output_dir, job["name"] + ".job.json")
+        result_file = os.path.join(output_dir, job["name"] + ".result.json")
+        log_file = os.path.join(output_dir, job["name"] + ".log")
+        with open(job_file, "w") as f:
+            json.dump(job, f, indent=2)
+        if os.path.exists(result_file):
+            os.remove(result_file)
+
+        start = time.perf_counter()
+        with open(log_file, "w") as log:
+            process = subprocess.run(
+                [sys.executable, "-m", "snow.batch", "--job", job_file, "--result", result_file],
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                cwd=job.get("workdir", None)
+            )
+        runtime = time.perf_counter() - start
+
+        row = {
+            "name": job["name"],
+            "visfile": job["visfile"],
+            "status": "failed",
+            "returncode": process.returncode,
+            "runtime": runtime,
+            "log": log_file,
+            "psnr": None,
+            "caltables": [],
+            "output_visfile": None
+        }
+        if process.returncode == 0 and os.path.exists(result_file):
+            with open(result_file, "r") as f:
+                row.update(json.load(f))
+            row["status"] = "done"
+            row["runtime"] = runtime
+        print("Job {0} {1} in {2:0.1f} s - log: {3}".format(job["name"], row["status"], runtime, log_file))
+        return row
+
+    def run(self) -> list:
+        """
+        Method that runs every job of the manifest and writes the consolidated results to results.json and
+        results.tsv in the output directory
+
+        Returns
+        -------
+        list:
+            A list with the result row of each job in manifest order
+        """
+        jobs = self._load_jobs()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self._run_worker, jobs))
+
+        with open(os.path.join(self.output_dir, "results.json"), "w") as f:
+            json.dump(results, f, indent=2)
+        with open(os.path.join(self.output_dir, "results.tsv"), "w") as f:
+            f.write(self.results_table(results, separator="\t") + "\n")
+        print(self.results_table(results))
+        return results
+
+    @staticmethod
+    def results_table(results: list = None, separator: str = "  ") -> str:
+        """
+        Static method that formats the job results as a table
+
+        Parameters
+        ----------
+        results :
+            List of result rows returned by run
+        separator :
+            Column separator
+
+        Returns
+        -------
+        str:
+            The table as a string
+        """
+        lines = [separator.join(["name", "status", "psnr", "runtime_s", "output_visfile", "caltables"])]
+        for row in results:
+            psnr = "{0:0.3f}".format(row["psnr"]) if row["psnr"] is not None else "-"
+            lines.append(
+                separator.join(
+                    [
+                        row["name"], row["status"], psnr, "{0:0.1f}".format(row["runtime"]),
+                        str(row["output_visfile"] or "-"), ",".join(row["caltables"]) or "-"
+                    ]
+                )
+            )
+        return "\n".join(lines)
@@ -1,13 +1,16 @@
+import glob
 import os
 import shlex
+import shutil
 import subprocess
 from typing import Tuple
 
-from casatasks import exportfits, fixvis, immath, importfits, tclean
+from casatasks import fixvis, tclean
 from casatools import image
 from dataclasses import dataclass, field
 
-from ..utils.image_utils import reproject
+from ..utils.image_utils import create_image_header, gaussian_beam_kernel, reproject
+from ..utils.psf_cache import get_uv_fingerprint, lookup_psf, restore_psf_products, store_psf
 from .imager import Imager
 
 from astropy.io import fits
@@ -15,6 +18,7 @@ import astropy.units as u
 from astropy.units import Quantity
 
 import numpy as np
+from scipy.signal import fftconvolve
 
 
 @dataclass(init=False, repr=True)
@@ -42,6 +46,13 @@ class GPUvmem(Imager):
     noise_cut : Mask threshold based one the inverse of the primary beam
     gridding : Whether to grid visibilities or not to increase computation speed
     print_images : Whether to output the intermediate images during the optimization
+    psf_cache : Whether to reuse the PSF and restoring beam of the residual image across runs while the uv-coverage,
+    the flags and the imaging parameters do not change
+    flag_tolerance : Largest change of the flagged fraction of visibilities for which a cached PSF is reused
+    psf_cache_directory : Absolute path to the directory of the cached PSF products. Default is None, and it means a
+    psf_cache directory next to the residual measurement set
+    psf_cache_entries : Maximum number of cached PSFs. Each one keeps a copy of the PSF, primary beam, weight and sum of
+    weights images on disk, and the least recently used ones are deleted first
     """
     executable: str = "gpuvmem"
     gpu_blocks: list = None
@@ -59,6 +70,10 @@ class GPUvmem(Imager):
     noise_cut: float = 10.0
     gridding: bool = False
     print_images: bool = False
+    psf_cache: bool = True
+    flag_tolerance: float = 0.01
+    psf_cache_directory: str = None
+    psf_cache_entries: int = 4
 
     def __init__(
         self,
@@ -78,6 +93,10 @@ class GPUvmem(Imager):
         noise_cut: float = 10.0,
         gridding: bool = False,
         print_images: bool = False,
+        psf_cache: bool = True,
+        flag_tolerance: float = 0.01,
+        psf_cache_directory: str = None,
+        psf_cache_entries: int = 4,
         **kwargs
     ):
 
@@ -105,6 +124,10 @@ class GPUvmem(Imager):
         self.noise_cut = noise_cut
         self.gridding = gridding
         self.print_images = print_images
+        self.psf_cache = psf_cache
+        self.flag_tolerance = flag_tolerance
+        self.psf_cache_directory = psf_cache_directory
+        self.psf_cache_entries = psf_cache_entries
 
         self.__model_input = None
         self.__user_mask = None
@@ -167,10 +190,12 @@ class GPUvmem(Imager):
     def __restore(self,
                   model_fits="",
                   residual_ms="",
-                  restored_image="restored") -> Tuple[str, str]:
+                  restored_image="restored") -> Tuple[str, np.ndarray, np.ndarray]:
         """
-        Private method that creates the restored image using CASA. This is done by convolving the gpuvmem model image with
-        the clean-beam and adding the residuals.
+        Private method that creates the restored image. The residual visibilities are imaged with tclean, the gpuvmem
+        model image is convolved with the clean-beam through an FFT and the residuals are added in memory. Only the
+        restored FITS image is written. If the PSF cache is enabled and the uv-coverage has not changed, the cached
+        PSF and restoring beam are reused and tclean only computes the residual image.
 
         Parameters
         ----------
@@ -183,22 +208,38 @@ class GPUvmem(Imager):
 
         Returns
         -------
-        Returns a tuple of strings with the absolute paths to the residual FITS image and the restored FITS image
+        Returns a tuple with the absolute path to the restored FITS image, and the restored and residual images as
+        numpy arrays in FITS axis order
         """
-        ia = image()
         residual_image = residual_ms.partition(".ms")[0] + ".residual"
         residual_casa_image = residual_image + ".image"
 
-        os.system(
-            "rm -rf *.log *.last " + residual_image +
-            ".* mod_out convolved_mod_out convolved_mod_out.fits " + restored_image + " " +
-            restored_image + ".fits"
-        )
-
-        importfits(imagename="model_out", fitsimage=model_fits, overwrite=True)
+        for path in glob.glob(glob.escape(residual_image) + ".*"):
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
 
         aux_reference_freq = self._check_reference_frequency()
 
+        cached = None
+        if self.psf_cache:
+            fingerprint = get_uv_fingerprint(residual_ms)
+            imaging_parameters = {
+                "weighting": self.weighting,
+                "robust": self.robust,
+                "cell": self.cell,
+                "M": self.M,
+                "N": self.N,
+                "stokes": self.stokes,
+                "phase_center": self.phase_center,
+                "reffreq": aux_reference_freq
+            }
+            cached = lookup_psf(fingerprint, imaging_parameters, self.flag_tolerance)
+            if cached is not None:
+                print("Reusing the cached PSF and restoring beam...")
+                restore_psf_products(cached, residual_image)
+
         tclean(
             vis=residual_ms,
             imagename=residual_image,
@@ -213,63 +254,57 @@ class GPUvmem(Imager):
             robust=self.robust,
             imsize=[self.M, self.N],
             cell=self.cell,
-            datacolumn='data'
-        )
-
-        exportfits(
-            imagename=residual_casa_image,
-            fitsimage=residual_casa_image + ".fits",
-            overwrite=True,
-            history=False
+            datacolumn='data',
+            calcpsf=cached is None,
+            restart=cached is not None
         )
 
+        ia = image()
         ia.open(infile=residual_casa_image)
-        record_beam = ia.restoringbeam()
-        ia.done()
-        ia.close()
-
-        ia.open(infile="model_out")
-        im2 = ia.convolve2d(
-            outfile="convolved_model_out",
-            axes=[0, 1],
-            type='gauss',
-            major=record_beam["major"],
-            minor=record_beam["minor"],
-            pa=record_beam["positionangle"],
-            overwrite=True
-        )
-        im2.done()
+        record_beam = ia.restoringbeam() if cached is None else cached.beam
+        # CASA arrays are ordered (x, y, stokes, frequency), the reverse of FITS
+        residual_data = np.transpose(ia.getchunk())
         ia.done()
-        ia.close()
 
-        ia.open(infile="convolved_model_out")
-        ia.setrestoringbeam(remove=True)
-        ia.setrestoringbeam(beam=record_beam)
-        ia.done()
-        ia.close()
+        if self.psf_cache and cached is None:
+            cache_directory = self.psf_cache_directory
+            if cache_directory is None:
+                cache_directory = os.path.join(
+                    os.path.dirname(os.path.abspath(residual_ms)), "psf_cache"
+                )
+            store_psf(
+                fingerprint, imaging_parameters, residual_image, record_beam, cache_directory,
+                self.psf_cache_entries, self.disk_budget
+            )
 
-        image_name_list = ["convolved_model_out", residual_casa_image + ".fits"]
+        with fits.open(model_fits) as hdul:
+            header = hdul[0].header.copy()
+            model_data = hdul[0].data.astype(np.float32)
+        residual_data = residual_data.reshape(model_data.shape).astype(np.float32)
 
-        immath(
-            imagename=image_name_list,
-            expr=" (IM0   + IM1) ",
-            outfile=restored_image,
-            imagemd=residual_casa_image + ".fits"
+        major = Quantity(record_beam["major"]["value"], record_beam["major"]["unit"]).to(u.deg)
+        minor = Quantity(record_beam["minor"]["value"], record_beam["minor"]["unit"]).to(u.deg)
+        pa = Quantity(record_beam["positionangle"]["value"], record_beam["positionangle"]["unit"])
+        kernel = gaussian_beam_kernel(
+            major.value, minor.value, pa.to(u.deg).value, header["CDELT1"], header["CDELT2"]
         )
+        kernel = kernel.reshape((1, ) * (model_data.ndim - 2) + kernel.shape)
+        restored_data = fftconvolve(model_data, kernel, mode="same", axes=(-2, -1))
+        restored_data = restored_data.astype(np.float32) + residual_data
 
-        exportfits(
-            imagename=restored_image,
-            fitsimage=restored_image + ".fits",
-            overwrite=True,
-            history=False
-        )
+        header["BUNIT"] = "Jy/beam"
+        header["BMAJ"] = major.value
+        header["BMIN"] = minor.value
+        header["BPA"] = pa.to(u.deg).value
+        restored_fits = restored_image + ".fits"
+        fits.writeto(restored_fits, restored_data, header, overwrite=True)
 
-        return residual_casa_image + ".fits", restored_image + ".fits"
+        return restored_fits, restored_data, residual_data
 
     def __create_model_input(self, name="model_input") -> str:
         """
-        Private method that reates a FITS file with the dirty image from tclean which has a header
-        that is then read by gpuvmem.
+        Private method that creates a FITS file with an empty image whose header is then read by gpuvmem. The
+        header is built from the measurement set metadata and the imaging parameters, as tclean would make it.
 
         Parameters
         ----------
@@ -282,23 +317,20 @@ class GPUvmem(Imager):
             A string with absolute path to the output FITS image file
         """
         fits_image = name + '.fits'
-        aux_reference_freq = self._check_reference_frequency()
-        tclean(
-            vis=self.inputvis,
-            imagename=name,
-            specmode='mfs',
-            niter=0,
-            deconvolver='hogbom',
-            reffreq=aux_reference_freq,
-            interactive=False,
-            phasecenter=self.phase_center,
+        header = create_image_header(
+            ms_name=self.inputvis,
             cell=self.cell,
-            stokes=self.stokes,
-            robust=self.robust,
-            imsize=[self.M, self.N],
-            weighting=self.weighting
+            M=self.M,
+            N=self.N,
+            phase_center=self.phase_center,
+            reference_freq=self.reference_freq,
+            stokes=self.stokes
+        )
+        data = np.zeros(
+            (header["NAXIS4"], header["NAXIS3"], header["NAXIS2"], header["NAXIS1"]),
+            dtype=np.float32
         )
-        exportfits(imagename=name + '.image', fitsimage=fits_image, overwrite=True)
+        fits.writeto(fits_image, data, header, overwrite=True)
         self.__check_mask()
         return fits_image
 
@@ -376,14 +408,12 @@ class GPUvmem(Imager):
         if not os.path.exists(model_output):
             raise FileNotFoundError("The model image has not been created")
         else:
-            # Restore the image using CASA
-            residual_fits, restored_fits = self.__restore(
+            # Restore the image in memory
+            restored_fits, restored_data, residual_data = self.__restore(
                 model_fits=model_output,
                 residual_ms=_residual_output,
                 restored_image=restored_image
             )
 
-        # Calculate PSNR and RMS using astropy and numpy
-        self._calculate_statistics_fits(
-            signal_fits_name=restored_fits, residual_fits_name=residual_fits
-        )
+        # Calculate PSNR and RMS using numpy
+        self._calculate_statistics_arrays(signal_data=restored_data, residual_data=residual_data)
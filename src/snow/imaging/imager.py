@@ -6,7 +6,13 @@ from typing import Union
 
 from astropy.units import Quantity
 
-from ..utils import (calculate_number_antennas, calculate_psnr_fits, calculate_psnr_ms)
+import numpy as np
+
+from ..utils import (
+    calculate_number_antennas, calculate_psnr_arrays, calculate_psnr_fits, calculate_psnr_ms
+)
+from ..utils.disk_budget import DiskBudget
+from ..utils.tracing import Tracer
 
 
 @dataclass(init=True, repr=True)
@@ -76,6 +82,8 @@ class Imager(metaclass=ABCMeta):
     stdv: float = _field(init=False, default=0.0)
     name: float = _field(init=False, default="")
     nantennas: int = _field(init=False, default=0)
+    tracer: Tracer = _field(init=False, repr=False, default_factory=Tracer)
+    disk_budget: DiskBudget = _field(init=False, repr=False, default=None)
 
     def __post_init__(self):
         if self.inputvis is not None and self.inputvis != "":
@@ -96,14 +104,39 @@ class Imager(metaclass=ABCMeta):
         stdv_pixels :
             Pixels where to calculate the RMS
         """
-        if stdv_pixels is None:
-            psnr, peak, stdv = calculate_psnr_fits(
-                signal_fits_name, residual_fits_name, self.noise_pixels
-            )
-        else:
-            psnr, peak, stdv = calculate_psnr_fits(
-                signal_fits_name, residual_fits_name, stdv_pixels
-            )
+        with self.tracer.span("psnr_statistics"):
+            if stdv_pixels is None:
+                psnr, peak, stdv = calculate_psnr_fits(
+                    signal_fits_name, residual_fits_name, self.noise_pixels
+                )
+            else:
+                psnr, peak, stdv = calculate_psnr_fits(
+                    signal_fits_name, residual_fits_name, stdv_pixels
+                )
+
+        self.psnr = peak / stdv
+        self.peak = peak
+        self.stdv = stdv
+
+    def _calculate_statistics_arrays(
+        self, signal_data: np.ndarray = None, residual_data: np.ndarray = None, stdv_pixels=None
+    ) -> None:
+        """
+        Calculates the peak signal-to-noise ratio, peak and rms for images held in memory in FITS axis order.
+
+        Parameters
+        ----------
+        signal_data :
+            Restored image
+        residual_data :
+            Residual image
+        stdv_pixels :
+            Pixels where to calculate the RMS
+        """
+        with self.tracer.span("psnr_statistics"):
+            if stdv_pixels is None:
+                stdv_pixels = self.noise_pixels
+            psnr, peak, stdv = calculate_psnr_arrays(signal_data, residual_data, stdv_pixels)
 
         self.psnr = peak / stdv
         self.peak = peak
@@ -124,10 +157,13 @@ class Imager(metaclass=ABCMeta):
         stdv_pixels :
             Pixels where to calculate the RMS
         """
-        if stdv_pixels is None:
-            psnr, peak, stdv = calculate_psnr_ms(
-                signal_ms_name, residual_ms_name, self.noise_pixels
-            )
+        with self.tracer.span("psnr_statistics"):
+            if stdv_pixels is None:
+                psnr, peak, stdv = calculate_psnr_ms(
+                    signal_ms_name, residual_ms_name, self.noise_pixels
+                )
+            else:
+                psnr, peak, stdv = calculate_psnr_ms(signal_ms_name, residual_ms_name, stdv_pixels)
 
         self.psnr = peak / stdv
         self.peak = peak
@@ -1,8 +1,29 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import warnings
+
 from casatasks import tclean
 
 from dataclasses import dataclass, field
 from .imager import Imager
 
+# Script that runs tclean with the arguments of a JSON file. Under MPI, importing start_mpi turns
+# every rank except the first one into a CASA MPI server.
+_TCLEAN_SCRIPT = """import json
+import sys
+
+if sys.argv[2] == "mpi":
+    import casampi.private.start_mpi
+from casatasks import tclean
+
+with open(sys.argv[1], "r") as f:
+    tclean(**json.load(f))
+"""
+
 
 @dataclass(init=True, repr=True)
 class Tclean(Imager):
@@ -59,6 +80,18 @@ class Tclean(Imager):
             Apply PB correction on the output restored image
         cycle_niter :
             Maximum number of minor-cycle iterations (per plane) before triggering a major cycle
+        parallel :
+            Whether to run the imaging in parallel or not. Cube images are parallelized over channels and mfs images
+            over the data in the major cycle
+        mpi_ranks :
+            Number of processes of the parallel run, including the client process
+        mpi_launcher :
+            Executable used to launch the parallel run, e.g. "mpicasa" or "mpirun". If it cannot be found the image is
+            made in a single local process using mpi_ranks OpenMP threads
+        model_mode :
+            How to save the model visibilities when save_model is True. "modelcolumn" writes the MODEL_DATA column and
+            "virtual" only stores the model in the measurement set, so model visibilities are predicted on the fly by
+            the tasks that read them
         clean_savemodel :
             Options to save model visibilities (none, virtual, modelcolumn)
         kwargs :
@@ -85,19 +118,39 @@ class Tclean(Imager):
     uvrange: str = ""
     pbcor: bool = False
     cycle_niter: int = 0
+    parallel: bool = False
+    mpi_ranks: int = 4
+    mpi_launcher: str = "mpicasa"
+    model_mode: str = "modelcolumn"
     clean_savemodel: str = field(init=False, repr=True, default=None)
 
     def __post_init__(self):
 
         super().__post_init__()
 
+        if self.model_mode not in ("modelcolumn", "virtual"):
+            raise ValueError("Error, model_mode must be either 'modelcolumn' or 'virtual'")
+
         if self.save_model:
-            self.clean_savemodel = "modelcolumn"
+            self.clean_savemodel = self.model_mode
 
-    def run(self, imagename=""):
+    def _tclean_arguments(self, imagename: str = "") -> dict:
+        """
+        Method that returns the tclean arguments of this imager
+
+        Parameters
+        ----------
+        imagename :
+            The absolute path to the output image name
+
+        Returns
+        -------
+        dict:
+            A dictionary with the tclean arguments
+        """
         __imsize = [self.M, self.N]
         aux_reference_freq = self._check_reference_frequency()
-        tclean(
+        return dict(
             vis=self.inputvis,
             imagename=imagename,
             field=self.field,
@@ -134,6 +187,86 @@ class Tclean(Imager):
             verbose=self.verbose
         )
 
+    def _run_parallel(self, tclean_arguments: dict = None) -> None:
+        """
+        Method that runs tclean in parallel. If this process is already the client of a CASA MPI session tclean is
+        called directly with parallel=True. Otherwise tclean runs in a new process group started with mpi_launcher,
+        or in a single local process with mpi_ranks OpenMP threads if the launcher is not available.
+
+        The model visibilities are not saved by the parallel run. If they are needed, they are predicted afterwards
+        from the model image with a serial tclean that does not recompute the PSF nor the residuals.
+
+        Parameters
+        ----------
+        tclean_arguments :
+            Dictionary with the tclean arguments
+        """
+        if self.interactive:
+            raise ValueError("Error, interactive cleaning cannot run in parallel")
+
+        parallel_arguments = dict(tclean_arguments, savemodel="none", parallel=True)
+
+        try:
+            from casampi.MPIEnvironment import MPIEnvironment
+            mpi_enabled = MPIEnvironment.is_mpi_enabled
+        except ImportError:
+            mpi_enabled = False
+
+        if mpi_enabled:
+            tclean(**parallel_arguments)
+        else:
+            launcher = shutil.which(self.mpi_launcher)
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                script_file = os.path.join(tmp_dir, "run_tclean.py")
+                arguments_file = os.path.join(tmp_dir, "tclean.json")
+                with open(script_file, "w") as f:
+                    f.write(_TCLEAN_SCRIPT)
+
+                env = dict(os.environ)
+                if launcher is not None:
+                    args = [
+                        launcher, "-n",
+                        str(self.mpi_ranks), sys.executable, script_file, arguments_file, "mpi"
+                    ]
+                else:
+                    warnings.warn(
+                        "{0} was not found, imaging in a single local process with {1} threads".format(
+                            self.mpi_launcher, self.mpi_ranks
+                        )
+                    )
+                    parallel_arguments["parallel"] = False
+                    env["OMP_NUM_THREADS"] = str(self.mpi_ranks)
+                    args = [sys.executable, script_file, arguments_file, "local"]
+
+                with open(arguments_file, "w") as f:
+                    json.dump(parallel_arguments, f)
+
+                print(" ".join(args))
+                process = subprocess.run(args, env=env)
+                if process.returncode != 0:
+                    raise RuntimeError(
+                        "Parallel tclean failed with return code {0}".format(process.returncode)
+                    )
+
+        if self.clean_savemodel is not None and self.clean_savemodel != "none":
+            tclean(
+                **dict(
+                    tclean_arguments,
+                    niter=0,
+                    interactive=False,
+                    calcres=False,
+                    calcpsf=False,
+                    restart=True
+                )
+            )
+
+    def run(self, imagename=""):
+        tclean_arguments = self._tclean_arguments(imagename)
+        if self.parallel and self.mpi_ranks > 1:
+            self._run_parallel(tclean_arguments)
+        else:
+            tclean(**tclean_arguments)
+
         if self.deconvolver != "mtmfs":
             restored_image = imagename + ".image"
             residual_image = imagename + ".residual"
@@ -1,4 +1,5 @@
 from .ampcal import Ampcal
 from .apcal import AmpPhasecal
 from .phasecal import Phasecal
+from .pipeline import Pipeline
 from .selfcal import Selfcal
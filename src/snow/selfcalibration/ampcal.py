@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 
-from casatasks import applycal, gaincal, rmtables
+from casatasks import gaincal
 
 from .selfcal import Selfcal
 
@@ -25,73 +25,62 @@ class Ampcal(Selfcal):
         self._loops = len(self.solint)
         self.__solnorm = solnorm
 
-        self._copy_directory_at_start()
-        self._init_selfcal()
+    def _caltable_name(self, current_iteration: int = 0) -> str:
+        return self.output_caltables + 'ampcal_' + str(current_iteration)
+
+    def _flag_version_name(self, current_iteration: int = 0) -> str:
+        return 'before_ampcal_' + str(current_iteration)
+
+    def _solve(self, caltable: str = "", solint: str = "") -> None:
+        gaincal(
+            vis=self.visfile,
+            field=self.imager.field,
+            caltable=caltable,
+            spw=self.imager.spw,
+            uvrange=self.uvrange,
+            gaintype=self.gaintype,
+            refant=self.refant,
+            calmode=self._calmode,
+            combine=self.combine,
+            solint=solint,
+            minsnr=self.minsnr,
+            minblperant=self.minblperant,
+            gaintable=self.input_caltable,
+            spwmap=self.spwmap,
+            solnorm=self.__solnorm
+        )
+
+        self._plot_selfcal(
+            caltable,
+            xaxis="time",
+            yaxis="amp",
+            iteration="antenna",
+            subplot=[4, 2],
+            plotrange=[0, 0, 0.2, 1.8],
+            want_plot=self.want_plot
+        )
+
+    def _convergence_reference(self) -> str:
+        # Solutions are incremental on top of the input calibration table
+        return None
+
+    def _apply(self, caltable: str = "") -> None:
+        self._applycal(
+            gaintable=[self.input_caltable, caltable], spwmap=[self.spwmap, self.spwmap]
+        )
+        self.input_caltable = caltable
+
+    def _start_run(self) -> None:
+        self._init_run("before_ampcal")
 
-    def run(self):
+    def run(self, resume: bool = False):
         """
         Function that runs amplitude self-calibration
-        """
-        self._init_run("before_ampcal")
 
-        for i in range(0, self._loops):
-            caltable = self.output_caltables + 'ampcal_' + str(i)
-            self._caltables.append(caltable)
-            rmtables(caltable)
-
-            self._set_attributes_from_dicts(i)
-
-            gaincal(
-                vis=self.visfile,
-                field=self.imager.field,
-                caltable=caltable,
-                spw=self.imager.spw,
-                uvrange=self.uvrange,
-                gaintype=self.gaintype,
-                refant=self.refant,
-                calmode=self.calmode,
-                combine=self.combine,
-                solint=self.solint[i],
-                minsnr=self.minsnr,
-                minblperant=self.minblperant,
-                gaintable=self.input_caltable,
-                spwmap=self.spwmap,
-                solnorm=self.__solnorm
-            )
-
-            self._plot_selfcal(
-                caltable,
-                xaxis="time",
-                yaxis="amp",
-                iteration="antenna",
-                subplot=[4, 2],
-                plotrange=[0, 0, 0.2, 1.8],
-                want_plot=self.want_plot
-            )
-
-            version_name = 'before_ampcal_' + str(i)
-            self._save_selfcal(caltable_version=version_name, overwrite=True)
-            self._caltables_versions.append(version_name)
-
-            print("Applying calibration tables to {0} file".format(self.visfile))
-            applycal(
-                vis=self.visfile,
-                spw=self.spw,
-                spwmap=[self.spwmap, self.spwmap],
-                field=self.field,
-                gaintable=[self.input_caltable, caltable],
-                gainfield='',
-                calwt=False,
-                flagbackup=False,
-                interp=self.interp,
-                applymode=self.applymode
-            )
-            self.input_caltable = caltable
-
-            if self.flag_dataset:
-                self._flag_dataset(mode=self.flag_mode)
-
-            self._run_imager(i)
-
-            if self._finish_selfcal_iteration(i):
-                break
+        Parameters
+        ----------
+        resume :
+            Whether to resume from the last checkpoint or not
+        """
+        self._run_iterations(*self._prepare_run(resume))
+        self._finish_run()
@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+
+from .selfcal import Selfcal
+
+
+@dataclass(init=False, repr=True)
+class Pipeline:
+
+    def __init__(self, stages: list = None):
+        """
+        Self-calibration pipeline that runs an ordered list of self-calibration objects on one shared working
+        measurement set. Only the first stage copies the measurement set and runs the initial imaging. Each following
+        stage starts from the last image statistics, model column and calibration tables of the previous one.
+
+        Parameters
+        ----------
+        stages :
+            Ordered list of self-calibration objects, e.g. [Phasecal(...), AmpPhasecal(...)]
+        """
+        if not stages:
+            raise ValueError("Error, the pipeline needs at least one self-calibration stage")
+        for stage in stages:
+            if not isinstance(stage, Selfcal):
+                raise ValueError("The pipeline stages must be instances of Selfcal")
+        self.stages = stages
+
+    @property
+    def visfile(self) -> str:
+        return self.stages[-1].visfile
+
+    @property
+    def psnr_history(self) -> list:
+        return self.stages[-1]._psnr_history
+
+    def run(self, resume: bool = False) -> Selfcal:
+        """
+        Method that runs the self-calibration stages in order
+
+        Parameters
+        ----------
+        resume :
+            Whether to resume each stage from its last checkpoint or not
+
+        Returns
+        -------
+        The last self-calibration stage
+        """
+        previous_stage = None
+        for stage in self.stages:
+            if previous_stage is not None:
+                stage._handover(previous_stage)
+            stage.run(resume=resume)
+            previous_stage = stage
+        return self.stages[-1]
+
+    def selfcal_output(self, **kwargs) -> str:
+        """
+        Method that creates the self-calibrated measurement set of the last stage
+
+        Parameters
+        ----------
+        kwargs :
+            Arguments of Selfcal.selfcal_output
+
+        Returns
+        -------
+        Name of the self-calibrated measurement set file
+        """
+        return self.stages[-1].selfcal_output(**kwargs)
@@ -1,20 +1,105 @@
 from __future__ import annotations
 
 import copy
+import json
+import multiprocessing
 import os
 import shutil
 import warnings
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from dataclasses import dataclass
+from typing import Tuple
 
-from casatasks import (clearcal, delmod, flagdata, flagmanager, split, statwt, uvsub)
-from casatools import table
+from casatasks import (
+    clearcal, delmod, flagmanager, mstransform, partition, rmtables, split, statwt, uvsub
+)
 
 from ..imaging.imager import Imager
-from ..utils.selfcal_utils import is_column_in_ms
-
-tb = table()
+from ..utils.caltable_utils import calculate_solution_change, read_caltable
+from ..utils.disk_budget import Artifact, DiskBudget, get_disk_usage
+from ..utils.mms_utils import is_mms, run_on_subms
+from ..utils.plot_utils import plot_caltable_solutions
+from ..utils.ms_metadata import get_ms_metadata
+from ..utils.selfcal_utils import is_column_in_ms, is_model_in_ms, solint_to_seconds
+from ..utils.snapshot import snapshot_ms
+from ..utils.tracing import Tracer
+
+# Time bin in seconds of the averaged proxy measurement set when every solution interval is infinite
+_DEFAULT_PROXY_TIMEBIN = 60.0
+
+# Rough throughputs used by the preflight runtime estimate: visibilities per second of a calibration pass
+# (solve or apply) and of an imaging major cycle, and image pixels per second of a minor cycle iteration
+_CALIBRATION_RATE = 2.0e7
+_GRIDDING_RATE = 5.0e6
+_PIXEL_RATE = 5.0e8
+
+# Number of image products written by each imaging run (image, residual, model, psf, pb, sumwt, mask)
+_IMAGE_PRODUCTS = 7
+
+
+def _run_trial(
+    selfcal: Selfcal,
+    candidate: dict = None,
+    visfile: str = "",
+    caltable: str = "",
+    current_iteration: int = 0,
+    imagename: str = ""
+) -> dict:
+    """
+    Function that runs one self-calibration trial on an isolated copy of the measurement set. It is executed
+    inside a worker process of the solution interval search.
+
+    Parameters
+    ----------
+    selfcal :
+        Copy of the self-calibration object that launches the trial
+    candidate :
+        Dictionary with the solution interval and the self-calibration attributes to try
+    visfile :
+        Absolute path to the measurement set copy of this trial
+    caltable :
+        Absolute path to the output calibration table
+    current_iteration :
+        Self-calibration iteration that the trial runs
+    imagename :
+        Absolute path to the output image name
+
+    Returns
+    -------
+    dict:
+        A dictionary with the trial products and the imager statistics. The PSNR is None if the solutions converged
+    """
+    selfcal.visfile = visfile
+    selfcal.imager.inputvis = visfile
+    for key, value in candidate.items():
+        if key != "solint":
+            setattr(selfcal, key, value)
+
+    if selfcal._solve_iteration(caltable, candidate["solint"], current_iteration):
+        return {
+            "candidate": candidate,
+            "visfile": visfile,
+            "caltable": caltable,
+            "imagename": imagename,
+            "psnr": None
+        }
+    selfcal._apply_iteration()
+    selfcal._run_imager(current_iteration, imagename, candidate["solint"])
+    selfcal._flush_plots()
+
+    return {
+        "candidate": candidate,
+        "visfile": visfile,
+        "caltable": caltable,
+        "imagename": imagename,
+        "input_caltable": selfcal.input_caltable,
+        "gaintable_chain": selfcal._gaintable_chains[-1],
+        "psnr": selfcal.imager.psnr,
+        "peak": selfcal.imager.peak,
+        "stdv": selfcal.imager.stdv
+    }
 
 
 @dataclass(init=False, repr=True)
@@ -45,7 +130,22 @@ class Selfcal(metaclass=ABCMeta):
         combine: str = "",
         flag_dataset: bool = False,
         restore_psnr: bool = False,
-        subtract_source: bool = False
+        rollback_mode: str = "copy",
+        subtract_source: bool = False,
+        snapshot_mode: str = "auto",
+        snapshot_workers: int = None,
+        checkpoint: str = None,
+        convergence_phase: float = None,
+        convergence_amplitude: float = None,
+        partition_axis: str = None,
+        partition_subms: int = None,
+        partition_workers: int = None,
+        proxy_average: bool = False,
+        proxy_timebin: str = None,
+        proxy_chanbin: int = 1,
+        proxy_iterations: int = None,
+        disk_budget: int = None,
+        keep_artifacts: int = None
     ):
         """
         General self-calibration class
@@ -94,9 +194,57 @@ class Selfcal(metaclass=ABCMeta):
             Whether to flag Fourier residuals outliers
         restore_psnr :
             Restores the dataset if the peak signal-to-noise ratio decreases
+        rollback_mode :
+            How to restore the dataset when restore_psnr is True. "copy" keeps a copy of the measurement set of the
+            last improving iteration. "flagversions" keeps a single measurement set and rolls back by restoring the
+            flag version and re-applying the previous chain of calibration tables
         subtract_source :
             Subtract source model if needed
+        snapshot_mode :
+            Strategy to create the measurement set copies: "auto", "reflink", "hardlink" or "copy"
+        snapshot_workers :
+            Number of threads used when measurement set files need to be copied
+        checkpoint :
+            Absolute path to the checkpoint file written after every self-calibration stage. Default is None, and it
+            means output_caltables + calmode + "_checkpoint.json"
+        convergence_phase :
+            Stop the loop before applying and imaging when the largest per-antenna median phase change of the new
+            solutions is below this value in degrees. Default is None, and it means not to check the phases
+        convergence_amplitude :
+            Stop the loop before applying and imaging when the largest per-antenna median amplitude change of the new
+            solutions is below this value. Default is None, and it means not to check the amplitudes
+        partition_axis :
+            Partition the working measurement set into a Multi-MS by "scan" or "spw" when it is created at the start
+            of the run. applycal, flagdata and statwt are then run on every sub-measurement set at the same time.
+            Default is None, and it means to work on a single measurement set
+        partition_subms :
+            Number of sub-measurement sets of the Multi-MS. Default is None, and it means one per scan or spw
+        partition_workers :
+            Maximum number of local processes working on the sub-measurement sets when not running under MPI.
+            Default is None, and it means min(number of sub-measurement sets, number of cpus)
+        proxy_average :
+            Whether to solve and image on a time and channel averaged proxy of the working measurement set or not.
+            The final chain of calibration tables is applied to the full resolution measurement set when the proxy
+            is left
+        proxy_timebin :
+            Time bin of the proxy, e.g. "30s". Default is None, and it means half of the shortest finite solution
+            interval of the iterations run on the proxy, but never shorter than the integration time
+        proxy_chanbin :
+            Number of channels averaged together in the proxy
+        proxy_iterations :
+            Number of iterations run on the proxy. The following iterations run on the full resolution measurement
+            set after imaging it once to predict its model. Default is None, and it means every iteration
+        disk_budget :
+            Maximum number of bytes used by the measurement sets, calibration tables and images created by the run.
+            An iteration is not started if it is expected to exceed it. Default is None, and it means no limit
+        keep_artifacts :
+            Number of superseded measurement set copies and images kept besides the current and last-good ones.
+            Default is None, and it means to keep every copy and image
         """
+        # The tracer and the disk budget are created first so they can be shared with the imager
+        self._tracer = Tracer()
+        self._disk = DiskBudget(budget=disk_budget, keep=keep_artifacts)
+
         # Public variables
         self.visfile = visfile
         self.imager = imager
@@ -121,15 +269,37 @@ class Selfcal(metaclass=ABCMeta):
         self.combine = combine
         self.flag_dataset = flag_dataset
         self.restore_psnr = restore_psnr
+        self.rollback_mode = rollback_mode
         self.subtract_source = subtract_source
+        self.snapshot_mode = snapshot_mode
+        self.snapshot_workers = snapshot_workers
+        self.checkpoint = checkpoint
+        self.convergence_phase = convergence_phase
+        self.convergence_amplitude = convergence_amplitude
+        self.partition_axis = partition_axis
+        self.partition_subms = partition_subms
+        self.partition_workers = partition_workers
+        self.proxy_average = proxy_average
+        self.proxy_timebin = proxy_timebin
+        self.proxy_chanbin = proxy_chanbin
+        self.proxy_iterations = proxy_iterations
+        self.disk_budget = disk_budget
+        self.keep_artifacts = keep_artifacts
 
         # Protected variables
         self._caltables = []
         self._caltables_versions = []
+        self._gaintable_chains = []
+        self._input_chain = None
         self._psnr_history = []
         self._calmode = ""
         self._loops = 0
         self._psnr_visfile_backup = self.visfile
+        self._run_prepared = False
+        self._shared_visfile = False
+        self._full_visfile = None
+        self._plot_executor = None
+        self._plot_futures = []
 
         if self.imager is None:
             self._image_name = ""
@@ -137,6 +307,12 @@ class Selfcal(metaclass=ABCMeta):
         if output_caltables is None:
             self.output_caltables = self.imager.output
 
+        if self.rollback_mode not in ("copy", "flagversions"):
+            raise ValueError("Error, rollback_mode must be either 'copy' or 'flagversions'")
+
+        if self.partition_axis not in (None, "scan", "spw"):
+            raise ValueError("Error, partition_axis must be either 'scan' or 'spw'")
+
         if self.varchange_imager is not None:
             list_of_values = [value for key, value in self.varchange_imager.items()]
             it = iter(list_of_values)
@@ -159,6 +335,13 @@ class Selfcal(metaclass=ABCMeta):
                     "Error, phase center needs to be set if a source is going to be subtracted"
                 )
 
+    def __getstate__(self):
+        # Thread pools cannot be pickled when the object is sent to worker processes
+        state = self.__dict__.copy()
+        state["_plot_executor"] = None
+        state["_plot_futures"] = []
+        return state
+
     @property
     def imager(self):
         return self.__imager
@@ -171,6 +354,8 @@ class Selfcal(metaclass=ABCMeta):
             else:
                 self.__imager = input_imager
                 self.__imager.inputvis = self.visfile
+                self.__imager.tracer = self._tracer
+                self.__imager.disk_budget = self._disk
                 self._image_name = self.__imager.output
         else:
             self.__imager = None
@@ -197,6 +382,66 @@ class Selfcal(metaclass=ABCMeta):
         else:
             self.__input_caltable = ""
 
+    def _snapshot_visfile(self, current_visfile: str = "", current_iteration: int = -1) -> None:
+        """
+        Protected method that snapshots the current measurement set into a new file name, overwriting it
+        if it has already been created. The saved flag versions are copied with it, so that the snapshot can be
+        rolled back to the versions saved on the current measurement set.
+
+        Parameters
+        ----------
+        current_visfile :
+            Absolute path to the new measurement set
+        current_iteration :
+            Iteration that creates the snapshot
+        """
+        for path in (current_visfile, current_visfile + ".flagversions"):
+            if os.path.exists(path):
+                shutil.rmtree(path)
+        with self._tracer.span("ms_copy"):
+            strategy = snapshot_ms(
+                self.visfile, current_visfile, mode=self.snapshot_mode, workers=self.snapshot_workers
+            )
+            if os.path.isdir(self.visfile + ".flagversions"):
+                # flagmanager rewrites the version list in place, so the flag versions are never hardlinked
+                snapshot_ms(
+                    self.visfile + ".flagversions",
+                    current_visfile + ".flagversions",
+                    mode="copy",
+                    workers=self.snapshot_workers
+                )
+        print("Created {0} from {1} using {2}".format(current_visfile, self.visfile, strategy))
+        self._disk.register(current_visfile, "ms", current_iteration)
+
+    def _partition_visfile(self, current_visfile: str = "") -> None:
+        """
+        Protected method that partitions the current measurement set into a new Multi-MS, overwriting it if it has
+        already been created. The partition is also the working copy, so no other copy is made.
+
+        Parameters
+        ----------
+        current_visfile :
+            Absolute path to the new Multi-MS
+        """
+        if os.path.exists(current_visfile):
+            shutil.rmtree(current_visfile)
+        numsubms = "auto" if self.partition_subms is None else self.partition_subms
+        with self._tracer.span("partition"):
+            partition(
+                vis=self.visfile,
+                outputvis=current_visfile,
+                createmms=True,
+                separationaxis=self.partition_axis,
+                numsubms=numsubms,
+                flagbackup=False
+            )
+        self._disk.register(current_visfile, "ms")
+        print(
+            "Created Multi-MS {0} from {1} partitioned by {2}".format(
+                current_visfile, self.visfile, self.partition_axis
+            )
+        )
+
     def _copy_directory_at_start(self):
         if self.visfile is not None:
             path_object = Path(self.visfile)
@@ -205,10 +450,10 @@ class Selfcal(metaclass=ABCMeta):
                 Path.joinpath(path_object.parent, path_object.stem), path_object.suffix,
                 self._calmode + "0"
             )
-            # Copying dataset and overwriting if it has already been created
-            if os.path.exists(current_visfile):
-                shutil.rmtree(current_visfile)
-            shutil.copytree(self.visfile, current_visfile)
+            if self.partition_axis is not None and not is_mms(self.visfile):
+                self._partition_visfile(current_visfile)
+            else:
+                self._snapshot_visfile(current_visfile)
             self.visfile = current_visfile
             self.imager.inputvis = current_visfile
 
@@ -219,10 +464,7 @@ class Selfcal(metaclass=ABCMeta):
             Path.joinpath(path_object.parent, path_object.stem), path_object.suffix,
             self._calmode + str(iteration + 1)
         )
-        # Copying dataset and overwriting if it has already been created
-        if os.path.exists(current_visfile):
-            shutil.rmtree(current_visfile)
-        shutil.copytree(self.visfile, current_visfile)
+        self._snapshot_visfile(current_visfile, iteration)
 
         return current_visfile
 
@@ -241,13 +483,15 @@ class Selfcal(metaclass=ABCMeta):
         -------
         None
         """
-        if overwrite:
-            flagmanager(vis=self.visfile, mode='delete', versionname=caltable_version)
-        flagmanager(vis=self.visfile, mode='save', versionname=caltable_version)
+        with self._tracer.span("flagmanager_save"):
+            if overwrite:
+                flagmanager(vis=self.visfile, mode='delete', versionname=caltable_version)
+            flagmanager(vis=self.visfile, mode='save', versionname=caltable_version)
 
     def _reset_selfcal(self, caltable_version="") -> None:
         """
-        Protected function that resets the flags and deletes the model column if it is present in the measurement set
+        Protected function that resets the flags and deletes the model column or virtual model if it is present in the
+        measurement set
 
         Parameters
         ----------
@@ -258,7 +502,8 @@ class Selfcal(metaclass=ABCMeta):
         -------
         None
         """
-        flagmanager(vis=self.visfile, mode='restore', versionname=caltable_version)
+        with self._tracer.span("flagmanager_restore"):
+            flagmanager(vis=self.visfile, mode='restore', versionname=caltable_version)
         clearcal(self.visfile)
         delmod(vis=self.visfile, otf=True, scr=True)
 
@@ -275,13 +520,355 @@ class Selfcal(metaclass=ABCMeta):
         -------
         None
         """
-        flagmanager(vis=self.visfile, mode='restore', versionname=caltable_version)
+        with self._tracer.span("flagmanager_restore"):
+            flagmanager(vis=self.visfile, mode='restore', versionname=caltable_version)
         delmod(vis=self.visfile, otf=True, scr=True)
 
+    def _applycal(self, gaintable: list = None, spwmap: list = None, record: bool = True) -> None:
+        """
+        Protected method that applies a chain of calibration tables to the current measurement set
+
+        Parameters
+        ----------
+        gaintable :
+            List of calibration tables to apply
+        spwmap :
+            Spectral window map for each one of the calibration tables
+        record :
+            Whether to append the chain to the list of applied chains or not
+        """
+        print("Applying calibration tables to {0} file".format(self.visfile))
+        with self._tracer.span("applycal"):
+            run_on_subms(
+                "applycal",
+                self.visfile,
+                self.partition_workers,
+                field=self.field,
+                spw=self.spw,
+                spwmap=spwmap,
+                gaintable=gaintable,
+                gainfield='',
+                calwt=False,
+                flagbackup=False,
+                interp=self.interp,
+                applymode=self.applymode
+            )
+        if record:
+            self._gaintable_chains.append({"gaintable": gaintable, "spwmap": spwmap})
+
+    def _discard_iteration(self) -> None:
+        """
+        Protected method that drops the PSNR, the calibration table and the chain of calibration tables of a rejected
+        iteration, so that the last ones left are those of the accepted state
+        """
+        self._psnr_history.pop()
+        self._caltables.pop()
+        if self._gaintable_chains:
+            self._gaintable_chains.pop()
+
+    def _accepted_chain(self) -> dict:
+        """
+        Protected method that returns the chain of calibration tables of the accepted state: the last applied chain
+        that ends with the last accepted calibration table, or the chain the run started from if no table has been
+        accepted yet
+
+        Returns
+        -------
+        dict:
+            A dictionary with the gaintable and spwmap of the chain, or None if no calibration has been applied
+        """
+        if not self._caltables:
+            return self._input_chain
+        for chain in reversed(self._gaintable_chains):
+            if chain["gaintable"][-1] == self._caltables[-1]:
+                return chain
+        return None
+
+    def _rollback_selfcal(self) -> None:
+        """
+        Protected method that rolls back the last self-calibration iteration on the current measurement set once it
+        has been discarded. The flags are restored to the version saved before applying the rejected calibration
+        table and the previous chain of calibration tables is applied again. On the first iteration the chain the run
+        started from, either the one of the previous self-calibration or the input calibration table, is applied
+        again instead. The calibration is only cleared when none was applied before the run.
+        """
+        self._restore_selfcal(caltable_version=self._caltables_versions[-1])
+        accepted_chain = self._accepted_chain()
+        if accepted_chain is not None:
+            self._applycal(
+                gaintable=accepted_chain["gaintable"],
+                spwmap=accepted_chain["spwmap"],
+                record=False
+            )
+        else:
+            clearcal(self.visfile)
+
+    def _checkpoint_file(self) -> str:
+        """
+        Protected method that returns the absolute path to the checkpoint file of this object
+        """
+        if self.checkpoint is None:
+            return self.output_caltables + self._calmode + "_checkpoint.json"
+        return self.checkpoint
+
+    def _write_checkpoint(self, current_iteration: int = 0, stage: str = "") -> None:
+        """
+        Protected method that durably writes the state of the self-calibration after a completed stage. The file is
+        written to a temporary file, synced to disk and atomically renamed.
+
+        Parameters
+        ----------
+        current_iteration :
+            Iteration of the self-calibration loop. -1 refers to the run before the first iteration
+        stage :
+            Last completed stage: "gaincal", "applycal", "imaging", "finished" or "stopped"
+        """
+        imager_state = {
+            key: getattr(self.imager, key)
+            for key in ("inputvis", "psnr", "peak", "stdv", "model_input")
+            if isinstance(getattr(self.imager, key, None), (str, int, float))
+        }
+        state = {
+            "calmode": self._calmode,
+            "iteration": current_iteration,
+            "stage": stage,
+            "visfile": self.visfile,
+            "psnr_visfile_backup": self._psnr_visfile_backup,
+            "full_visfile": self._full_visfile,
+            "input_caltable": self.input_caltable,
+            "caltables": self._caltables,
+            "caltables_versions": self._caltables_versions,
+            "gaintable_chains": self._gaintable_chains,
+            "input_chain": self._input_chain,
+            "psnr_history": self._psnr_history,
+            "imager": imager_state
+        }
+        checkpoint_file = self._checkpoint_file()
+        temporary_file = checkpoint_file + ".tmp"
+        with open(temporary_file, "w") as f:
+            json.dump(state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_file, checkpoint_file)
+        directory_fd = os.open(os.path.dirname(os.path.abspath(checkpoint_file)), os.O_RDONLY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+
+    def _load_checkpoint(self) -> Tuple[int, str]:
+        """
+        Protected method that restores the state of this object and its imager from the checkpoint file
+
+        Returns
+        -------
+        tuple:
+            A tuple with the iteration and the last completed stage saved in the checkpoint
+        """
+        with open(self._checkpoint_file(), "r") as f:
+            state = json.load(f)
+
+        if state["calmode"] != self._calmode:
+            raise ValueError(
+                "Error, the checkpoint was written by a {0} self-calibration".format(state["calmode"])
+            )
+
+        self.visfile = state["visfile"]
+        self._psnr_visfile_backup = state["psnr_visfile_backup"]
+        self._full_visfile = state.get("full_visfile")
+        self.input_caltable = state["input_caltable"]
+        self._caltables = state["caltables"]
+        self._caltables_versions = state["caltables_versions"]
+        self._gaintable_chains = state["gaintable_chains"]
+        self._input_chain = state.get("input_chain")
+        self._psnr_history = state["psnr_history"]
+        for key, value in state["imager"].items():
+            setattr(self.imager, key, value)
+        self.imager.inputvis = self.visfile
+
+        print(
+            "Resuming from iteration {0} after stage {1} on {2}".format(
+                state["iteration"], state["stage"], self.visfile
+            )
+        )
+        return state["iteration"], state["stage"]
+
+    def _prepare_run(self, resume: bool = False) -> Tuple[int, str]:
+        """
+        Protected method that prepares the self-calibration run. The measurement set is copied and the imager is run
+        to initialize the model column. If resume is True and a checkpoint exists, the state is restored from it
+        instead.
+
+        Parameters
+        ----------
+        resume :
+            Whether to resume from the last checkpoint or not
+
+        Returns
+        -------
+        tuple:
+            A tuple with the first iteration to run and the last completed stage of that iteration if any
+        """
+        if self._run_prepared:
+            return 0, None
+        self._run_prepared = True
+
+        if resume and os.path.exists(self._checkpoint_file()):
+            current_iteration, stage = self._load_checkpoint()
+            if stage == "stopped":
+                return self._loops, None
+            elif stage == "finished":
+                return current_iteration + 1, None
+            else:
+                return current_iteration, stage
+
+        if not self._shared_visfile:
+            self._copy_directory_at_start()
+            self._init_selfcal()
+        if self.proxy_average:
+            self._enter_proxy()
+        self._start_run()
+        self._write_checkpoint(-1, "finished")
+        return 0, None
+
+    def _finish_run(self) -> None:
+        """
+        Protected method that waits for the pending plots, writes the tracing spans of the run to a JSON file and
+        prints a summary of the time spent on each stage
+        """
+        if self._full_visfile is not None:
+            self._leave_proxy()
+        self._flush_plots()
+        trace_file = self.output_caltables + self._calmode + "_trace.json"
+        self._tracer.to_json(trace_file)
+        print("Self-calibration stages summary (written to {0}):".format(trace_file))
+        print(self._tracer.report())
+        print("Disk usage of the run:")
+        print(self._disk.report())
+
+    def _proxy_timebin(self) -> str:
+        """
+        Protected method that returns the time bin of the averaged proxy measurement set
+        """
+        if self.proxy_timebin is not None:
+            return self.proxy_timebin
+        integration_time = get_ms_metadata(self.visfile).integration_time
+        solints = self.solint if self.proxy_iterations is None else self.solint[:self.proxy_iterations]
+        finite_solints = [
+            seconds for seconds in
+            (solint_to_seconds(solint, integration_time) for solint in solints)
+            if seconds != float("inf")
+        ]
+        timebin = 0.5 * min(finite_solints) if finite_solints else _DEFAULT_PROXY_TIMEBIN
+        return "{0}s".format(max(timebin, integration_time))
+
+    def _enter_proxy(self) -> None:
+        """
+        Protected method that averages the working measurement set into a proxy and makes it the current measurement
+        set. Only the data column is averaged, so the chain of calibration tables of the accepted state is applied to
+        the proxy again.
+        """
+        path_object = Path(self.visfile)
+        proxy_visfile = "{0}_{2}{1}".format(
+            Path.joinpath(path_object.parent, path_object.stem), path_object.suffix,
+            self._calmode + "proxy"
+        )
+        if os.path.exists(proxy_visfile):
+            shutil.rmtree(proxy_visfile)
+        timebin = self._proxy_timebin()
+        with self._tracer.span("mstransform"):
+            mstransform(
+                vis=self.visfile,
+                outputvis=proxy_visfile,
+                datacolumn="data",
+                keepflags=False,
+                timeaverage=True,
+                timebin=timebin,
+                chanaverage=self.proxy_chanbin > 1,
+                chanbin=self.proxy_chanbin
+            )
+        self._disk.register(proxy_visfile, "ms")
+        print(
+            "Created proxy {0} from {1} averaging {2} and {3} channels".format(
+                proxy_visfile, self.visfile, timebin, self.proxy_chanbin
+            )
+        )
+        self._full_visfile = self.visfile
+        self.visfile = proxy_visfile
+        self.imager.inputvis = proxy_visfile
+        self._psnr_visfile_backup = proxy_visfile
+        accepted_chain = self._accepted_chain()
+        if accepted_chain is not None:
+            self._applycal(
+                gaintable=accepted_chain["gaintable"],
+                spwmap=accepted_chain["spwmap"],
+                record=False
+            )
+
+    def _leave_proxy(self, refresh_model: bool = False, current_iteration: int = -1) -> None:
+        """
+        Protected method that applies the chain of calibration tables of the accepted state to the full resolution
+        measurement set and makes it the current measurement set again, so a rejected last iteration is never
+        applied. Flags raised on the proxy are not transferred.
+
+        Parameters
+        ----------
+        refresh_model :
+            Whether to image the full resolution measurement set to predict its model or not
+        current_iteration :
+            Iteration that leaves the proxy
+        """
+        print("Leaving proxy {0} for {1}".format(self.visfile, self._full_visfile))
+        self.visfile = self._full_visfile
+        self.imager.inputvis = self._full_visfile
+        self._psnr_visfile_backup = self._full_visfile
+        self._full_visfile = None
+        accepted_chain = self._accepted_chain()
+        if accepted_chain is not None:
+            self._applycal(
+                gaintable=accepted_chain["gaintable"],
+                spwmap=accepted_chain["spwmap"],
+                record=False
+            )
+        if refresh_model:
+            imagename = self._image_name + "_" + self._calmode + "_full"
+            with self._tracer.span("imager.run"):
+                self.imager.run(imagename)
+            self._disk.register(imagename, "image", current_iteration)
+            # The PSNR of the proxy is replaced so the next iterations are compared at full resolution
+            if self._psnr_history:
+                self._psnr_history[-1] = self.imager.psnr
+            else:
+                self._psnr_history.append(self.imager.psnr)
+            print("Full resolution: - PSNR: {0:0.3f}".format(self.imager.psnr))
+
+    def _handover(self, previous_selfcal: Selfcal = None) -> None:
+        """
+        Protected method that continues the self-calibration of a previous object on its working measurement set.
+        No copy of the measurement set is made, and the last image statistics, the model column, the last calibration
+        table and the applied chain of calibration tables are taken directly from the previous object.
+
+        Parameters
+        ----------
+        previous_selfcal :
+            Self-calibration object that has already been run
+        """
+        self.previous_selfcal = previous_selfcal
+        self.visfile = previous_selfcal.visfile
+        self.imager.inputvis = previous_selfcal.visfile
+        self._psnr_visfile_backup = previous_selfcal.visfile
+        self._init_selfcal()
+        self._gaintable_chains = copy.deepcopy(previous_selfcal._gaintable_chains[-1:])
+        self.imager.psnr = previous_selfcal.imager.psnr
+        self.imager.peak = previous_selfcal.imager.peak
+        self.imager.stdv = previous_selfcal.imager.stdv
+        self._shared_visfile = True
+
     def _init_selfcal(self) -> None:
         """
         Protected function that initializes the input calibration tables and the PSNR history if any
-        previous self-calibration object is passed to the current object
+        previous self-calibration object is passed to the current object. The chain of calibration tables already
+        applied to the measurement set is kept so that rolling back the first iteration can apply it again.
 
         Returns
         -------
@@ -294,6 +881,13 @@ class Selfcal(metaclass=ABCMeta):
                 self.input_caltable = ""
             self._psnr_history = copy.deepcopy(self.previous_selfcal._psnr_history)
 
+        if self.previous_selfcal is not None and self.previous_selfcal._gaintable_chains:
+            self._input_chain = copy.deepcopy(self.previous_selfcal._gaintable_chains[-1])
+        elif self.input_caltable != "":
+            self._input_chain = {"gaintable": [self.input_caltable], "spwmap": self.spwmap}
+        else:
+            self._input_chain = None
+
     def _init_run(self, image_name_string: str = "") -> None:
         """
         Protected function that runs the imager at the beginning of the self-calibration run in order to initializes
@@ -306,41 +900,459 @@ class Selfcal(metaclass=ABCMeta):
         """
         if not self._ismodel_in_dataset() or self.previous_selfcal is None:
             imagename = self._image_name + image_name_string
-            self.imager.run(imagename)
+            with self._tracer.span("imager.run"):
+                self.imager.run(imagename)
+            self._disk.register(imagename, "image")
             print("Original: - PSNR: {0:0.3f}".format(self.imager.psnr))
             print("Peak: {0:0.3f} mJy/beam".format(self.imager.peak * 1000.0))
             print("Noise: {0:0.3f} mJy/beam".format(self.imager.stdv * 1000.0))
             self._psnr_history.append(self.imager.psnr)
 
-    def _run_imager(self, current_iteration: int = 0) -> None:
+    def _run_imager(
+        self, current_iteration: int = 0, imagename: str = None, solint: str = None
+    ) -> None:
         """
         Protected method that runs the imager at a certain self-calibration iteration
 
         Parameters
         ----------
-        iter :
+        current_iteration :
             Iteration number during the loop
+        imagename :
+            Absolute path to the output image name. Default is None, and it means the image name of the iteration
+        solint :
+            Solution interval of the iteration. Default is None, and it means the one of the iteration
         """
-        imagename = self._image_name + '_' + self._calmode + str(current_iteration)
+        if imagename is None:
+            imagename = self._image_name + '_' + self._calmode + str(current_iteration)
+        if solint is None:
+            solint = self.solint[current_iteration]
 
-        self.imager.run(imagename)
+        with self._tracer.span("imager.run", current_iteration):
+            self.imager.run(imagename)
+        self._disk.register(imagename, "image", current_iteration)
 
         self._psnr_history.append(self.imager.psnr)
 
         print(
-            "Solint: {0} - PSNR: {1:0.3f}".format(
-                self.solint[current_iteration], self._psnr_history[-1]
-            )
+            "Solint: {0} - PSNR: {1:0.3f}".format(solint, self._psnr_history[-1])
         )
         print("Peak: {0:0.3f} mJy/beam".format(self.imager.peak * 1000.0))
         print("Noise: {0:0.3f} mJy/beam".format(self.imager.stdv * 1000.0))
 
+    def _convergence_reference(self) -> str:
+        """
+        Protected method that returns the calibration table that new solutions are compared to in order to check
+        convergence. Default is the previous calibration table of this object, or None (unit gains) if there is none.
+        Objects that solve incrementally on top of the last table should return None.
+        """
+        if len(self._caltables) > 1:
+            return self._caltables[-2]
+        return None
+
+    def _solutions_converged(self, caltable: str = "") -> bool:
+        """
+        Protected method that checks if the solutions of a new calibration table changed less than the convergence
+        thresholds with respect to the reference table
+
+        Parameters
+        ----------
+        caltable :
+            Absolute path to the new calibration table
+
+        Returns
+        -------
+        True if the solutions converged, False otherwise or if no threshold is set
+        """
+        if self.convergence_phase is None and self.convergence_amplitude is None:
+            return False
+
+        phase_change, amplitude_change = calculate_solution_change(
+            caltable, self._convergence_reference()
+        )
+        print(
+            "Solution change - phase: {0:0.3f} deg - amplitude: {1:0.4f}".format(
+                phase_change, amplitude_change
+            )
+        )
+        if self.convergence_phase is not None and phase_change >= self.convergence_phase:
+            return False
+        if self.convergence_amplitude is not None and amplitude_change >= self.convergence_amplitude:
+            return False
+        print("Solutions converged - skipping calibration and imaging and exiting loop...")
+        return True
+
+    def _solve_iteration(
+        self, caltable: str = "", solint: str = "", current_iteration: int = 0
+    ) -> bool:
+        """
+        Protected method that solves for the calibration table of an iteration and saves the flags before it is
+        applied. If the solutions converged the table is deleted instead, since it is never applied.
+
+        Parameters
+        ----------
+        caltable :
+            Absolute path to the output calibration table
+        solint :
+            Solution interval
+        current_iteration :
+            Iteration number during the self-calibration loop
+
+        Returns
+        -------
+        True if the solutions converged, False otherwise
+        """
+        self._caltables.append(caltable)
+        rmtables(caltable)
+
+        with self._tracer.span("gaincal", current_iteration):
+            self._solve(caltable, solint)
+        self._disk.register(caltable, "caltable", current_iteration)
+
+        if self._solutions_converged(caltable):
+            self._caltables.pop()
+            # The pending plot of the table may still be reading it
+            self._flush_plots()
+            rmtables(caltable)
+            self._disk.unregister(caltable)
+            return True
+
+        version_name = self._flag_version_name(current_iteration)
+        self._save_selfcal(caltable_version=version_name, overwrite=True)
+        self._caltables_versions.append(version_name)
+        return False
+
+    def _apply_iteration(self) -> None:
+        """
+        Protected method that applies the calibration table of the current iteration. Fourier residual outliers are
+        flagged afterwards if flag_dataset is True.
+        """
+        self._apply(self._caltables[-1])
+
+        if self.flag_dataset:
+            self._flag_dataset(mode=self.flag_mode)
+
+    def _run_iterations(self, start_iteration: int = 0, completed_stage: str = None) -> None:
+        """
+        Protected method that runs the self-calibration loop over the solution intervals. A checkpoint is written
+        after each stage of every iteration.
+
+        Parameters
+        ----------
+        start_iteration :
+            First iteration to run
+        completed_stage :
+            Last completed stage of the first iteration when resuming: "gaincal", "applycal" or "imaging"
+        """
+        if start_iteration >= self._loops:
+            return
+
+        for i in range(start_iteration, self._loops):
+            stage = completed_stage if i == start_iteration else None
+
+            if self._full_visfile is not None and self.proxy_iterations is not None:
+                if i >= self.proxy_iterations:
+                    self._leave_proxy(refresh_model=True, current_iteration=i)
+
+            self._set_attributes_from_dicts(i)
+
+            if stage is None:
+                self._disk.check(self._disk.estimate())
+
+                if self._solve_iteration(self._caltable_name(i), self.solint[i], i):
+                    self._write_checkpoint(i, "stopped")
+                    break
+                self._write_checkpoint(i, "gaincal")
+
+            if stage in (None, "gaincal"):
+                if stage == "gaincal":
+                    # Undo the flags of an interrupted applycal
+                    flagmanager(
+                        vis=self.visfile, mode='restore', versionname=self._caltables_versions[-1]
+                    )
+                self._apply_iteration()
+                self._write_checkpoint(i, "applycal")
+
+            if stage != "imaging":
+                self._run_imager(i)
+                self._write_checkpoint(i, "imaging")
+
+            if self._finish_selfcal_iteration(i):
+                self._prune_artifacts(i)
+                self._write_checkpoint(i, "stopped")
+                break
+            self._prune_artifacts(i)
+            self._write_checkpoint(i, "finished")
+        else:
+            self._write_checkpoint(self._loops - 1, "stopped")
+
+    def preflight(self, raise_on_error: bool = True) -> dict:
+        """
+        Public method that validates the self-calibration settings against the metadata of the measurement set
+        before a run, and estimates its disk footprint and runtime. The reference antenna, the spectral window
+        map, the solution intervals, the mask files and the free disk space are checked.
+
+        Parameters
+        ----------
+        raise_on_error :
+            Whether to raise a ValueError if any check fails or not
+
+        Returns
+        -------
+        dict:
+            A dictionary with the list of "errors", the list of "warnings", the estimated "disk_bytes", the
+            "free_bytes" of the output filesystem and the estimated "runtime" in seconds
+        """
+        errors = []
+        warnings_list = []
+        if not os.path.exists(self.visfile):
+            raise FileNotFoundError("The Measurement Set File {0} does not exist".format(self.visfile))
+        metadata = get_ms_metadata(self.visfile)
+
+        for antenna in [antenna.strip() for antenna in self.refant.split(",") if antenna.strip()]:
+            if antenna.isdigit() and int(antenna) < len(metadata.antenna_names):
+                antenna = metadata.antenna_names[int(antenna)]
+            if antenna not in metadata.antenna_names:
+                errors.append("Reference antenna {0} is not in the ANTENNA table".format(antenna))
+            elif metadata.antenna_flags[metadata.antenna_names.index(antenna)]:
+                warnings_list.append("Reference antenna {0} is flagged".format(antenna))
+
+        spwmaps = self.spwmap if self.spwmap and isinstance(self.spwmap[0], list) else [self.spwmap]
+        for spwmap in [spwmap for spwmap in spwmaps if spwmap]:
+            if len(spwmap) != metadata.nspw:
+                errors.append(
+                    "spwmap has {0} entries but the measurement set has {1} spectral windows".format(
+                        len(spwmap), metadata.nspw
+                    )
+                )
+            if any(spw >= metadata.nspw for spw in spwmap):
+                errors.append("spwmap refers to spectral windows that do not exist")
+
+        solints = list(self.solint)
+        if self.varchange_selfcal is not None and "solint" in self.varchange_selfcal:
+            solints += list(self.varchange_selfcal["solint"])
+        for solint in solints:
+            try:
+                seconds = solint_to_seconds(solint, metadata.integration_time)
+            except (ValueError, TypeError):
+                errors.append("Solution interval {0} cannot be parsed".format(solint))
+                continue
+            if seconds < metadata.integration_time:
+                errors.append(
+                    "Solution interval {0} is shorter than the integration time of {1:0.2f}s".format(
+                        solint, metadata.integration_time
+                    )
+                )
+
+        masks = [getattr(self.imager, key, None) for key in ("mask", "user_mask")]
+        if self.varchange_imager is not None:
+            for key in ("mask", "user_mask"):
+                masks += list(self.varchange_imager.get(key, []))
+        for mask in masks:
+            # Region strings such as "circle[[...]]" are not files
+            if isinstance(mask, str) and mask != "" and "[" not in mask and not os.path.exists(mask):
+                errors.append("Mask {0} does not exist".format(mask))
+
+        # Disk footprint: the working copy, one copy per improving iteration, the images and the output
+        ms_bytes = get_disk_usage(self.visfile)
+        ms_copies = 2
+        if self.restore_psnr and self.rollback_mode == "copy":
+            ms_copies += self._loops
+        image_bytes = self.imager.M * self.imager.N * 4 * _IMAGE_PRODUCTS * (self._loops + 1)
+        disk_bytes = ms_bytes * ms_copies + image_bytes
+        output_directory = os.path.dirname(os.path.abspath(self.visfile))
+        free_bytes = shutil.disk_usage(output_directory).free
+        if disk_bytes > free_bytes:
+            errors.append(
+                "Estimated disk footprint of {0:0.3f} GB exceeds the {1:0.3f} GB free in {2}".format(
+                    disk_bytes / 1024.0**3, free_bytes / 1024.0**3, output_directory
+                )
+            )
+        if self.disk_budget is not None and disk_bytes > self.disk_budget:
+            warnings_list.append("Estimated disk footprint exceeds the disk budget")
+
+        # Runtime: a solve and an apply per iteration plus the major and minor cycles of every imaging run
+        visibilities = metadata.nrows * max(metadata.spw_nchan, default=1)
+        calibration_time = 2.0 * visibilities / _CALIBRATION_RATE
+        imaging_time = 2.0 * visibilities / _GRIDDING_RATE + \
+            self.imager.niter * self.imager.M * self.imager.N / _PIXEL_RATE
+        runtime = self._loops * calibration_time + (self._loops + 1) * imaging_time
+
+        print("Preflight of {0}:".format(self.visfile))
+        print(
+            "Rows: {0} - Spectral windows: {1} - Antennas: {2} - Integration time: {3:0.2f}s".format(
+                metadata.nrows, metadata.nspw, metadata.nantennas, metadata.integration_time
+            )
+        )
+        print(
+            "Estimated disk footprint: {0:0.3f} GB ({1:0.3f} GB free)".format(
+                disk_bytes / 1024.0**3, free_bytes / 1024.0**3
+            )
+        )
+        print("Estimated runtime: {0:0.1f} min".format(runtime / 60.0))
+        for message in warnings_list:
+            print("Warning: " + message)
+        for message in errors:
+            print("Error: " + message)
+
+        if errors and raise_on_error:
+            raise ValueError("Preflight failed:\n" + "\n".join(errors))
+        return {
+            "errors": errors,
+            "warnings": warnings_list,
+            "disk_bytes": disk_bytes,
+            "free_bytes": free_bytes,
+            "runtime": runtime
+        }
+
+    def _prune_artifacts(self, current_iteration: int = 0) -> None:
+        """
+        Protected method that deletes the superseded measurement set copies and images according to keep_artifacts
+        and prints the disk usage after an iteration. The current measurement set, the last-good backup and the
+        images of the last accepted iteration are never deleted.
+
+        Parameters
+        ----------
+        current_iteration :
+            Iteration number during the self-calibration loop
+        """
+        self._disk.prune("ms", [self.visfile, self._psnr_visfile_backup, self._full_visfile])
+        last_good_iteration = len(self._caltables) - 1
+        self._disk.prune(
+            "image", [
+                artifact.path for artifact in self._disk.artifacts
+                if artifact.kind == "image" and artifact.iteration == last_good_iteration
+            ]
+        )
+        print(
+            "Disk usage after iteration {0}: {1:0.3f} GB (added {2:0.3f} GB)".format(
+                current_iteration,
+                self._disk.usage() / 1024.0**3,
+                self._disk.iteration_usage().get(current_iteration, 0) / 1024.0**3
+            )
+        )
+
+    def search(self, candidates: list = None, max_workers: int = None) -> list:
+        """
+        Public method that tries several candidate solution intervals at the same time. Each candidate is solved,
+        applied and imaged in its own process on an isolated copy of the current measurement set. The candidate
+        with the highest PSNR is promoted: its measurement set, calibration table and statistics become the current
+        state of this object. If restore_psnr is True the winner is only promoted if it improves the PSNR.
+
+        Parameters
+        ----------
+        candidates :
+            List of dictionaries with a "solint" key and optionally other self-calibration attributes to try,
+            e.g. [{"solint": "inf", "combine": "spw"}, {"solint": "60s", "minsnr": 2.0}].
+            Default is None, and it means to try every solint of this object
+        max_workers :
+            Maximum number of worker processes. Default is None, and it means
+            min(number of candidates, number of cpus)
+
+        Returns
+        -------
+        list:
+            A list with the result dictionary of each candidate
+        """
+        if candidates is None:
+            candidates = [{"solint": solint} for solint in self.solint]
+        if not candidates:
+            raise ValueError("Error, at least one candidate is needed to search")
+        if not all("solint" in candidate for candidate in candidates):
+            raise ValueError("Error, every candidate must have a solint")
+        if max_workers is None:
+            max_workers = min(len(candidates), os.cpu_count())
+
+        self._prepare_run()
+
+        current_iteration = len(self._caltables)
+        path_object = Path(self.visfile)
+        trials = []
+        for k in range(0, len(candidates)):
+            trial_visfile = "{0}_{2}{1}".format(
+                Path.joinpath(path_object.parent, path_object.stem), path_object.suffix,
+                "trial" + str(k)
+            )
+            self._snapshot_visfile(trial_visfile, current_iteration)
+            trials.append(
+                (
+                    trial_visfile, self._caltable_name(current_iteration) + "_trial" + str(k),
+                    current_iteration, self._image_name + '_' + self._calmode +
+                    str(current_iteration) + "_trial" + str(k)
+                )
+            )
+
+        results = []
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = [
+                executor.submit(_run_trial, self, candidate, *trial)
+                for candidate, trial in zip(candidates, trials)
+            ]
+            for candidate, trial, future in zip(candidates, trials, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print("Candidate {0} failed: {1}".format(candidate, e))
+                    results.append(
+                        {
+                            "candidate": candidate,
+                            "visfile": trial[0],
+                            "caltable": trial[1],
+                            "imagename": trial[3],
+                            "psnr": None
+                        }
+                    )
+
+        for result in results:
+            if result["psnr"] is not None:
+                print(
+                    "Candidate {0} - PSNR: {1:0.3f}".format(result["candidate"], result["psnr"])
+                )
+
+        finished = [result for result in results if result["psnr"] is not None]
+        winner = max(finished, key=lambda result: result["psnr"]) if finished else None
+        if winner is not None and self.restore_psnr and winner["psnr"] <= self._psnr_history[-1]:
+            print("No candidate improved the PSNR - keeping the current measurement set")
+            winner = None
+
+        for result in results:
+            if result is not winner:
+                Artifact(path=result["visfile"], kind="ms").delete()
+                Artifact(path=result["imagename"], kind="image").delete()
+                self._disk.unregister(result["visfile"])
+                rmtables(result["caltable"])
+
+        if winner is not None:
+            print("Promoting candidate {0}".format(winner["candidate"]))
+            for key, value in winner["candidate"].items():
+                if key != "solint":
+                    setattr(self, key, value)
+            self._caltables.append(winner["caltable"])
+            self._disk.register(winner["caltable"], "caltable", current_iteration)
+            self._disk.register(winner["imagename"], "image", current_iteration)
+            self._caltables_versions.append(self._flag_version_name(current_iteration))
+            self._gaintable_chains.append(winner["gaintable_chain"])
+            self._psnr_history.append(winner["psnr"])
+            self.input_caltable = winner["input_caltable"]
+            self.imager.psnr = winner["psnr"]
+            self.imager.peak = winner["peak"]
+            self.imager.stdv = winner["stdv"]
+            self._psnr_visfile_backup = self.visfile
+            self.visfile = winner["visfile"]
+            self.imager.inputvis = winner["visfile"]
+
+        return results
+
     def _finish_selfcal_iteration(self, current_iteration: int = 0) -> bool:
         """
         Protected method that finishes self-calibration iterations. If the PSNR of the current iteration improves then
         a new dataset is created and the measurement set file name is changed. Otherwise the flags are restored to the
         last version and the PSNR history and last calibration table are popped from the lists. The measurement set
-        name is changed to the last (the one that had better PSNR).
+        name is changed to the last (the one that had better PSNR). If rollback_mode is "flagversions", or if there is
+        no backup measurement set, no datasets are created and the previous calibration is re-applied to the current
+        measurement set instead.
 
         Parameters
         ----------
@@ -362,16 +1374,25 @@ class Selfcal(metaclass=ABCMeta):
 
                 if self._psnr_history[-1] <= self._psnr_history[-2]:
 
+                    if self.rollback_mode == "flagversions" or self._psnr_visfile_backup == self.visfile:
+                        print(
+                            "PSNR decreasing or equal in this solution interval - rolling back calibration and exiting loop..."
+                        )
+                        self._discard_iteration()
+                        self._rollback_selfcal()
+                        return True
                     print(
                         "PSNR decreasing or equal in this solution interval - restoring to last MS and exiting loop..."
                     )
                     self._restore_selfcal(caltable_version=self._caltables_versions[-1])
-                    self._psnr_history.pop()
-                    self._caltables.pop()
+                    self._discard_iteration()
                     # Restoring to last MS
                     self.visfile = self._psnr_visfile_backup
                     self.imager.inputvis = self._psnr_visfile_backup
                     return True
+                elif self.rollback_mode == "flagversions":
+                    print("PSNR improved on iteration {0}".format(current_iteration))
+                    return False
                 else:
                     print(
                         "PSNR improved on iteration {0} - Copying measurement set files...".
@@ -424,45 +1445,43 @@ class Selfcal(metaclass=ABCMeta):
 
         print("Flagging {0} data column using {1}".format(datacolumn, mode))
 
-        flagdata(
-            vis=self.visfile,
-            mode=mode,
-            datacolumn=datacolumn,
-            field=self.field,
-            timecutoff=5.0,
-            freqcutoff=5.0,
-            freqfit='line',
-            flagdimension='freq',
-            extendflags=False,
-            timedevscale=timedevscale,
-            freqdevscale=freqdevscale,
-            spectralmax=500,
-            extendpols=False,
-            growaround=False,
-            flagneartime=False,
-            flagnearfreq=False,
-            ntime="scan",
-            action='apply',
-            flagbackup=True,
-            overwrite=True,
-            writeflags=True
-        )
+        with self._tracer.span("flagdata"):
+            run_on_subms(
+                "flagdata",
+                self.visfile,
+                self.partition_workers,
+                mode=mode,
+                datacolumn=datacolumn,
+                field=self.field,
+                timecutoff=5.0,
+                freqcutoff=5.0,
+                freqfit='line',
+                flagdimension='freq',
+                extendflags=False,
+                timedevscale=timedevscale,
+                freqdevscale=freqdevscale,
+                spectralmax=500,
+                extendpols=False,
+                growaround=False,
+                flagneartime=False,
+                flagnearfreq=False,
+                ntime="scan",
+                action='apply',
+                flagbackup=True,
+                overwrite=True,
+                writeflags=True
+            )
 
     def _ismodel_in_dataset(self) -> bool:
         """
-        Protected function that checks if the MODEL_DATA column exists in the current measurement set file
+        Protected function that checks if the MODEL_DATA column or a virtual model exists in the current measurement
+        set file
 
         Returns
         -------
-        None
+        True if model visibilities are present, False otherwise
         """
-        tb.open(tablename=self.visfile)
-        columns = tb.colnames()
-        tb.close()
-        if "MODEL_DATA" in columns:
-            return True
-        else:
-            return False
+        return is_model_in_ms(self.visfile)
 
     def _set_attributes_from_dicts(self, current_iteration: int = 0) -> None:
         """
@@ -495,22 +1514,85 @@ class Selfcal(metaclass=ABCMeta):
         want_plot=False,
         **kwargs
     ):
+        """
+        Protected method that plots the solutions of a calibration table against time into PNG files. The table is
+        read in the calling thread, since CASA tools are not thread-safe, and the rendering is done by a background
+        thread so the next self-calibration step does not wait for it. Plots are flushed by _flush_plots.
+
+        Parameters
+        ----------
+        caltable :
+            Absolute path to the calibration table
+        xaxis :
+            Quantity on the x axis. Only "time" is supported
+        yaxis :
+            Quantity on the y axis: "phase" or "amp"
+        iteration :
+            "antenna" to plot each antenna in its own panel
+        timerange :
+            Not used, kept for compatibility with plotms
+        antenna :
+            Comma separated antenna names to plot
+        subplot :
+            Number of rows and columns of panels per page
+        plotrange :
+            [xmin, xmax, ymin, ymax] of the panels. Equal minimum and maximum mean autoscale
+        want_plot :
+            Whether to plot the calibration table or not
+        """
+        if not want_plot:
+            return
+        if xaxis not in ("", "time"):
+            warnings.warn("Only time can be plotted on the x axis, ignoring xaxis={0}".format(xaxis))
+
         figfile_name = caltable + ".png"
-        if want_plot:
-            print("Plot selfcal is trying to plot, but the function is not part of CASA 6 yet")
-            # au.plotms(vis=caltable, xaxis=xaxis, yaxis=yaxis, iteration=iteration, gridrows=subplot[0],
-            # gridcols=subplot[1], antenna=antenna, timerange=timerange, plotrange=plotrange, plotfile=figfile_name,
-            # overwrite=True, showgui=True)
-        else:
-            print("Plot selfcal is trying to plot, but the function is not part of CASA 6 yet")
-            # au.plotms(vis=caltable, xaxis=xaxis, yaxis=yaxis, iteraxis=iteration, gridrows=subplot[0],
-            # gridcols=subplot[1], antenna=antenna, timerange=timerange, plotrange=plotrange, plotfile=figfile_name,
-            # overwrite=True, showgui=False)
+        solutions = read_caltable(caltable)
+        if self._plot_executor is None:
+            self._plot_executor = ThreadPoolExecutor(max_workers=1)
+        self._plot_futures.append(
+            self._plot_executor.submit(
+                plot_caltable_solutions,
+                solutions,
+                figfile_name,
+                yaxis=yaxis,
+                iteration=iteration,
+                antenna=antenna,
+                subplot=subplot,
+                plotrange=plotrange
+            )
+        )
 
-    def selfcal_output(self, overwrite=False, _statwt=False, min_samp=8) -> str:
+    def _flush_plots(self) -> None:
+        """
+        Protected method that waits until every pending plot has been written
+        """
+        for future in self._plot_futures:
+            try:
+                print("Plots written to {0}".format(", ".join(future.result())))
+            except Exception as e:
+                warnings.warn("A calibration table could not be plotted: {0}".format(e))
+        self._plot_futures = []
+        if self._plot_executor is not None:
+            self._plot_executor.shutdown(wait=True)
+            self._plot_executor = None
+
+    def selfcal_output(
+        self,
+        overwrite=False,
+        _statwt=False,
+        min_samp=8,
+        datacolumn=None,
+        timebin="0s",
+        width=1,
+        statwt_only=False
+    ) -> str:
         """
         Public function that creates a new measurement set only taking the corrected column.
-        If _statwt is True then applies the statwt function and creates a .statwt measurement
+        If _statwt is True then applies the statwt function and creates a .statwt measurement.
+        The working measurement set is split once, and the .statwt measurement set is a snapshot of the split output
+        that is reweighted in place. If the working measurement set is a Multi-MS, the split keeps its
+        sub-measurement sets so they are reweighted at the same time, and both outputs are merged from it. The
+        output measurement sets are always single measurement sets.
 
         Parameters
         ----------
@@ -520,31 +1602,85 @@ class Selfcal(metaclass=ABCMeta):
             Whether to create a new measurement applying the statwt function
         min_samp :
             Minimum number of unflagged visibilities for estimating the scatter if _statwt is True
+        datacolumn :
+            Column to write into the data column of the outputs. Default is None, and it means "corrected" if the
+            column exists and "data" otherwise
+        timebin :
+            Time averaging bin of the outputs, e.g. "30s". Default is "0s", and it means no averaging
+        width :
+            Number of channels averaged together in the outputs
+        statwt_only :
+            Whether to only create the .statwt measurement set or not. It requires _statwt to be True
         Returns
         -------
         Name of the self-calibrated measurement set file
         """
         output_vis = self.visfile + '.selfcal'
-        data_column = ""
-        if overwrite:
-            if os.path.exists(output_vis):
-                shutil.rmtree(output_vis)
-        if is_column_in_ms(self.visfile, "CORRECTED_DATA"):
-            data_column = "corrected"
-        else:
-            # Raise warning
-            warnings.warn(
-                "Corrected data column is not present, data column will be extracted instead."
+        statwt_path = output_vis + '.statwt'
+        if statwt_only and not _statwt:
+            raise ValueError("Error, statwt_only requires _statwt to be True")
+
+        if datacolumn is None:
+            if is_column_in_ms(self.visfile, "CORRECTED_DATA"):
+                datacolumn = "corrected"
+            else:
+                # Raise warning
+                warnings.warn(
+                    "Corrected data column is not present, data column will be extracted instead."
+                )
+                datacolumn = "data"
+        split_vis = statwt_path if statwt_only else output_vis
+        if os.path.exists(statwt_path):
+            shutil.rmtree(statwt_path)
+        if overwrite and os.path.exists(output_vis):
+            shutil.rmtree(output_vis)
+
+        with self._tracer.span("selfcal_output"):
+            if _statwt and is_mms(self.visfile):
+                # The split keeps the sub-measurement sets, so statwt runs on all of them at the same time
+                statwt_mms = output_vis + '.mms'
+                if os.path.exists(statwt_mms):
+                    shutil.rmtree(statwt_mms)
+                split(
+                    vis=self.visfile,
+                    outputvis=statwt_mms,
+                    datacolumn=datacolumn,
+                    timebin=timebin,
+                    width=width,
+                    keepmms=True
+                )
+                if not statwt_only:
+                    split(vis=statwt_mms, outputvis=output_vis, datacolumn="data", keepmms=False)
+                run_on_subms(
+                    "statwt",
+                    statwt_mms,
+                    self.partition_workers,
+                    datacolumn="data",
+                    minsamp=min_samp
+                )
+                split(vis=statwt_mms, outputvis=statwt_path, datacolumn="data", keepmms=False)
+                shutil.rmtree(statwt_mms)
+                return statwt_path if statwt_only else output_vis
+
+            split(
+                vis=self.visfile,
+                outputvis=split_vis,
+                datacolumn=datacolumn,
+                timebin=timebin,
+                width=width,
+                keepmms=False
             )
-            data_column = "data"
-        split(vis=self.visfile, outputvis=output_vis, datacolumn=data_column)
-        if _statwt:
-            statwt_path = output_vis + '.statwt'
-            if os.path.exists(statwt_path):
-                shutil.rmtree(statwt_path)
-            shutil.copytree(output_vis, statwt_path)
-            statwt(vis=statwt_path, datacolumn="data", minsamp=min_samp)
-        return output_vis
+            if _statwt:
+                if not statwt_only:
+                    snapshot_ms(
+                        output_vis,
+                        statwt_path,
+                        mode=self.snapshot_mode,
+                        workers=self.snapshot_workers
+                    )
+                statwt(vis=statwt_path, datacolumn="data", minsamp=min_samp)
+
+        return statwt_path if statwt_only else output_vis
 
     def _uvsubtract(self):
         uvsub(vis=self.visfile, reverse=False)
@@ -552,6 +1688,41 @@ class Selfcal(metaclass=ABCMeta):
     def _uvadd(self):
         uvsub(vis=self.visfile, reverse=True)
 
+    @abstractmethod
+    def _caltable_name(self, current_iteration: int = 0) -> str:
+        """
+        Abstract method that returns the calibration table name of a self-calibration iteration
+        """
+        pass
+
+    @abstractmethod
+    def _flag_version_name(self, current_iteration: int = 0) -> str:
+        """
+        Abstract method that returns the flag version name saved before applying the calibration of an iteration
+        """
+        pass
+
+    @abstractmethod
+    def _solve(self, caltable: str = "", solint: str = "") -> None:
+        """
+        Abstract method that solves for the calibration table of an iteration
+        """
+        pass
+
+    @abstractmethod
+    def _apply(self, caltable: str = "") -> None:
+        """
+        Abstract method that applies the calibration table of an iteration
+        """
+        pass
+
+    @abstractmethod
+    def _start_run(self) -> None:
+        """
+        Abstract method that prepares the measurement set and runs the imager before the first iteration
+        """
+        pass
+
     @abstractmethod
     def run(self):
         """
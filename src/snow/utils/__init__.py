@@ -1,2 +1,11 @@
-from .image_utils import nanrms, rms, get_header, get_hdu, get_hdul, get_data, get_header_and_data, export_ms_to_fits, calculate_psnr_fits, calculate_psnr_ms, reproject
-from .selfcal_utils import is_column_in_ms, get_table_rows, calculate_number_antennas
+from .image_stats import tiled_nanmax, tiled_nanrms, sigma_clipped_std
+from .image_utils import nanrms, rms, get_header, get_hdu, get_hdul, get_data, get_header_and_data, gaussian_beam_kernel, create_image_header, export_ms_to_fits, calculate_psnr_arrays, calculate_psnr_fits, iterate_casa_image, calculate_psnr_ms, same_pixel_grid, clear_reproject_cache, reproject
+from .selfcal_utils import is_column_in_ms, is_model_in_ms, get_table_rows, calculate_number_antennas, solint_to_seconds
+from .snapshot import snapshot_ms
+from .tracing import Span, Tracer
+from .ms_metadata import MSMetadata, get_ms_metadata, clear_ms_metadata_cache
+from .caltable_utils import read_caltable, calculate_solution_change
+from .plot_utils import plot_caltable_solutions
+from .mms_utils import is_mms, list_subms, run_on_subms
+from .disk_budget import Artifact, DiskBudget, get_disk_usage
+from .psf_cache import UVFingerprint, CachedPSF, get_uv_fingerprint, lookup_psf, store_psf, restore_psf_products, clear_psf_cache
@@ -0,0 +1,130 @@
+from typing import Tuple
+
+import numpy as np
+from casatools import table
+
+tb = table()
+
+
+def read_caltable(caltable: str = "") -> dict:
+    """
+    Function that reads the gain solutions of a calibration table
+
+    Parameters
+    ----------
+    caltable :
+        Absolute path to the calibration table
+
+    Returns
+    -------
+    dict:
+        A dictionary with the TIME, ANTENNA1, SPECTRAL_WINDOW_ID, CPARAM and FLAG columns and the ANTENNA_NAMES of the
+        table. CPARAM and FLAG are transposed to (row, channel, polarization)
+    """
+    tb.open(tablename=caltable)
+    solutions = {
+        "TIME": tb.getcol("TIME"),
+        "ANTENNA1": tb.getcol("ANTENNA1"),
+        "SPECTRAL_WINDOW_ID": tb.getcol("SPECTRAL_WINDOW_ID"),
+        "CPARAM": np.transpose(tb.getcol("CPARAM")),
+        "FLAG": np.transpose(tb.getcol("FLAG"))
+    }
+    tb.close()
+    tb.open(tablename=caltable + "/ANTENNA")
+    solutions["ANTENNA_NAMES"] = list(tb.getcol("NAME"))
+    tb.close()
+    return solutions
+
+
+def _match_solutions(solutions: dict, reference: dict) -> np.ndarray:
+    """
+    Function that finds, for each solution, the index of the reference solution of the same antenna and spectral
+    window that is closest in time
+
+    Parameters
+    ----------
+    solutions :
+        Solutions as returned by read_caltable
+    reference :
+        Reference solutions as returned by read_caltable
+
+    Returns
+    -------
+    An array with the index of the matching reference row, or -1 if there is none
+    """
+    tmin = min(solutions["TIME"].min(), reference["TIME"].min())
+    span = max(solutions["TIME"].max(), reference["TIME"].max()) - tmin + 1.0
+    nspw = max(solutions["SPECTRAL_WINDOW_ID"].max(), reference["SPECTRAL_WINDOW_ID"].max()) + 1
+
+    # Sorting key that keeps each antenna and spectral window in its own time range
+    def key(sols):
+        group = sols["ANTENNA1"].astype(np.float64) * nspw + sols["SPECTRAL_WINDOW_ID"]
+        return group, group * span + (sols["TIME"] - tmin)
+
+    group, values = key(solutions)
+    reference_group, reference_values = key(reference)
+    order = np.argsort(reference_values)
+    sorted_values = reference_values[order]
+    sorted_group = reference_group[order]
+
+    right = np.clip(np.searchsorted(sorted_values, values), 0, len(sorted_values) - 1)
+    left = np.clip(right - 1, 0, len(sorted_values) - 1)
+    left_valid = sorted_group[left] == group
+    right_valid = sorted_group[right] == group
+    use_left = left_valid & (
+        ~right_valid | (np.abs(values - sorted_values[left]) <= np.abs(sorted_values[right] - values))
+    )
+    index = np.where(use_left, order[left], order[right])
+    return np.where(left_valid | right_valid, index, -1)
+
+
+def calculate_solution_change(caltable: str = "",
+                              reference_caltable: str = None) -> Tuple[float, float]:
+    """
+    Function that calculates how much the gain solutions of a calibration table change with respect to a reference
+    table. Solutions are matched per antenna and spectral window to the closest reference solution in time. For each
+    antenna the median absolute phase change and the median absolute amplitude change over its unflagged solutions
+    are calculated, and the largest values over all antennas are returned.
+
+    Parameters
+    ----------
+    caltable :
+        Absolute path to the calibration table
+    reference_caltable :
+        Absolute path to the reference calibration table. Default is None, and it means to compare against unit gains
+
+    Returns
+    -------
+    tuple:
+        A tuple with the largest per-antenna phase change in degrees and amplitude change
+    """
+    solutions = read_caltable(caltable)
+    gains = solutions["CPARAM"]
+    flags = solutions["FLAG"]
+
+    if reference_caltable is None:
+        reference_gains = np.ones_like(gains)
+        reference_flags = np.zeros_like(flags)
+    else:
+        reference = read_caltable(reference_caltable)
+        index = _match_solutions(solutions, reference)
+        matched = index >= 0
+        safe_index = np.where(matched, index, 0)
+        reference_gains = reference["CPARAM"][safe_index]
+        reference_flags = reference["FLAG"][safe_index] | ~matched[:, np.newaxis, np.newaxis]
+
+    valid = ~(flags | reference_flags)
+    phase_change = np.abs(np.degrees(np.angle(gains * np.conj(reference_gains))))
+    amplitude_change = np.abs(np.abs(gains) - np.abs(reference_gains))
+
+    antennas = np.broadcast_to(solutions["ANTENNA1"][:, np.newaxis, np.newaxis], gains.shape)
+    max_phase_change = 0.0
+    max_amplitude_change = 0.0
+    for antenna in np.unique(solutions["ANTENNA1"]):
+        selection = valid & (antennas == antenna)
+        if np.any(selection):
+            max_phase_change = max(max_phase_change, float(np.median(phase_change[selection])))
+            max_amplitude_change = max(
+                max_amplitude_change, float(np.median(amplitude_change[selection]))
+            )
+    return max_phase_change, max_amplitude_change
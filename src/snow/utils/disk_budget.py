@@ -0,0 +1,286 @@
+import os
+import shutil
+from dataclasses import dataclass, field
+from typing import List
+
+# Products written by tclean under an image name prefix
+_TCLEAN_SUFFIXES = (".image", ".residual", ".psf", ".pb", ".model", ".sumwt", ".weight", ".mask")
+
+# Products written under an image name prefix, including the gpuvmem model, restored and residual images and
+# the tclean images of the gpuvmem residuals
+_IMAGE_SUFFIXES = _TCLEAN_SUFFIXES + (".fits", ".restored.fits", "_input.fits", "_residuals.ms") + tuple(
+    "_residuals.residual" + suffix for suffix in _TCLEAN_SUFFIXES + (".image.fits", )
+)
+
+
+def _inode_sizes(paths: List[str] = None) -> dict:
+    """
+    Function that returns the allocated size of every file under a list of paths. Files are keyed by device and
+    inode, so hardlinked files are only counted once.
+
+    Parameters
+    ----------
+    paths :
+        List of absolute paths to files or directories
+
+    Returns
+    -------
+    A dictionary with the allocated bytes of each (device, inode) pair
+    """
+    sizes = {}
+    for path in paths:
+        if os.path.isfile(path) and not os.path.islink(path):
+            stat = os.stat(path)
+            sizes[(stat.st_dev, stat.st_ino)] = stat.st_blocks * 512
+        for root, _, filenames in os.walk(path):
+            for filename in filenames:
+                file_path = os.path.join(root, filename)
+                if not os.path.islink(file_path):
+                    stat = os.stat(file_path)
+                    sizes[(stat.st_dev, stat.st_ino)] = stat.st_blocks * 512
+    return sizes
+
+
+def get_disk_usage(path: str = "") -> int:
+    """
+    Function that returns the bytes allocated by a file or directory, counting hardlinked files once
+
+    Parameters
+    ----------
+    path :
+        Absolute path to the file or directory
+
+    Returns
+    -------
+    int:
+        The disk usage in bytes
+    """
+    return sum(_inode_sizes([path]).values())
+
+
+@dataclass(init=True, repr=True)
+class Artifact:
+    """
+    Record of a file or directory created during a run
+
+    Parameters
+    ----------
+    path :
+        Absolute path to the artifact. For images it is the image name prefix of the imaging products
+    kind :
+        Kind of artifact: "ms", "caltable", "image" or "psf"
+    iteration :
+        Self-calibration iteration that created the artifact. -1 refers to the run before the first iteration
+    bytes_added :
+        Bytes that the artifact added to the disk usage when it was registered
+    """
+    path: str = ""
+    kind: str = ""
+    iteration: int = -1
+    bytes_added: int = 0
+
+    def paths(self) -> List[str]:
+        """
+        Method that returns the files and directories that belong to this artifact. The products of an image are
+        the known suffixes of its exact prefix, so other files that share the prefix, such as the measurement sets
+        of the run, are never included.
+
+        Raises
+        ------
+        ValueError:
+            If the artifact is an image with an empty prefix
+        """
+        if self.kind == "ms":
+            return [
+                path for path in (self.path, self.path + ".flagversions") if os.path.exists(path)
+            ]
+        elif self.kind == "image":
+            if self.path == "":
+                raise ValueError("Error, an image artifact needs a non-empty image name prefix")
+            return [
+                self.path + suffix for suffix in _IMAGE_SUFFIXES if os.path.exists(self.path + suffix)
+            ]
+        return [self.path] if os.path.exists(self.path) else []
+
+    def delete(self) -> None:
+        """
+        Method that deletes the files and directories that belong to this artifact
+        """
+        for path in self.paths():
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+
+@dataclass(init=True, repr=True)
+class DiskBudget:
+    """
+    Object that keeps track of the measurement sets, calibration tables and images created during a run, prunes
+    the superseded ones and checks that the run stays within a budget of bytes
+
+    Parameters
+    ----------
+    budget :
+        Maximum number of bytes that the artifacts can use. Default is None, and it means no limit
+    keep :
+        Number of superseded measurement sets and images kept besides the current and last-good ones. Default is
+        None, and it means to keep every artifact
+    artifacts :
+        List of registered artifacts
+    """
+    budget: int = None
+    keep: int = None
+    artifacts: List[Artifact] = field(init=True, repr=False, default_factory=list)
+
+    def register(self, path: str = "", kind: str = "", iteration: int = -1) -> Artifact:
+        """
+        Method that registers a new artifact and measures the bytes it adds to the disk usage
+
+        Parameters
+        ----------
+        path :
+            Absolute path to the artifact
+        kind :
+            Kind of artifact: "ms", "caltable", "image" or "psf"
+        iteration :
+            Self-calibration iteration that created the artifact
+
+        Returns
+        -------
+        Artifact:
+            The registered artifact
+        """
+        self.artifacts = [artifact for artifact in self.artifacts if artifact.path != path]
+        existing = _inode_sizes([p for artifact in self.artifacts for p in artifact.paths()])
+        artifact = Artifact(path=path, kind=kind, iteration=iteration)
+        artifact.bytes_added = sum(
+            size for inode, size in _inode_sizes(artifact.paths()).items() if inode not in existing
+        )
+        self.artifacts.append(artifact)
+        return artifact
+
+    def unregister(self, path: str = "") -> None:
+        """
+        Method that stops tracking an artifact that has been deleted elsewhere
+
+        Parameters
+        ----------
+        path :
+            Absolute path to the artifact
+        """
+        self.artifacts = [artifact for artifact in self.artifacts if artifact.path != path]
+
+    def usage(self) -> int:
+        """
+        Method that returns the bytes currently used by the registered artifacts that still exist
+
+        Returns
+        -------
+        int:
+            The disk usage in bytes
+        """
+        paths = [path for artifact in self.artifacts for path in artifact.paths()]
+        return sum(_inode_sizes(paths).values())
+
+    def iteration_usage(self) -> dict:
+        """
+        Method that returns the bytes added by the artifacts of each iteration
+
+        Returns
+        -------
+        dict:
+            A dictionary with the bytes added by each iteration
+        """
+        usage = {}
+        for artifact in self.artifacts:
+            usage[artifact.iteration] = usage.get(artifact.iteration, 0) + artifact.bytes_added
+        return usage
+
+    def estimate(self) -> int:
+        """
+        Method that estimates the bytes that the next iteration will add as the largest amount added by a previous
+        iteration. The artifacts created before the first iteration, such as the working copy of the measurement set,
+        are not counted.
+
+        Returns
+        -------
+        int:
+            The estimated number of bytes
+        """
+        return max(
+            (bytes_added for iteration, bytes_added in self.iteration_usage().items() if iteration >= 0),
+            default=0
+        )
+
+    def check(self, expected_bytes: int = 0) -> None:
+        """
+        Method that checks that the artifacts plus an expected amount of bytes fit in the budget
+
+        Parameters
+        ----------
+        expected_bytes :
+            Bytes that are going to be written
+
+        Raises
+        ------
+        RuntimeError:
+            If the budget would be exceeded
+        """
+        if self.budget is None:
+            return
+        usage = self.usage()
+        if usage + expected_bytes > self.budget:
+            raise RuntimeError(
+                "Error, disk budget of {0:0.3f} GB would be exceeded: {1:0.3f} GB used and "
+                "{2:0.3f} GB expected".format(
+                    self.budget / 1024.0**3, usage / 1024.0**3, expected_bytes / 1024.0**3
+                )
+            )
+
+    def prune(self, kind: str = "", protect: List[str] = None) -> List[str]:
+        """
+        Method that deletes the superseded artifacts of a kind. The protected artifacts and the last keep
+        registered ones are kept.
+
+        Parameters
+        ----------
+        kind :
+            Kind of artifact to prune
+        protect :
+            Paths of the artifacts that must not be deleted, such as the current and last-good ones
+
+        Returns
+        -------
+        list:
+            A list with the deleted artifact paths
+        """
+        if self.keep is None:
+            return []
+        protect = [path for path in protect if path is not None] if protect is not None else []
+        candidates = [
+            artifact for artifact in self.artifacts
+            if artifact.kind == kind and artifact.path not in protect
+        ]
+        superseded = candidates[:max(len(candidates) - self.keep, 0)]
+        for artifact in superseded:
+            artifact.delete()
+            self.artifacts.remove(artifact)
+        return [artifact.path for artifact in superseded]
+
+    def report(self) -> str:
+        """
+        Method that returns a human-readable table of the bytes added by each iteration
+
+        Returns
+        -------
+        str:
+            The table as a string
+        """
+        lines = ["{0:<10} {1:>14}".format("Iteration", "Added [MB]")]
+        for iteration, bytes_added in sorted(self.iteration_usage().items()):
+            lines.append("{0:<10d} {1:>14.3f}".format(iteration, bytes_added / 1024.0**2))
+        lines.append("{0:<10} {1:>14.3f}".format("In use", self.usage() / 1024.0**2))
+        if self.budget is not None:
+            lines.append("{0:<10} {1:>14.3f}".format("Budget", self.budget / 1024.0**2))
+        return "\n".join(lines)
@@ -0,0 +1,376 @@
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List
+
+import numpy as np
+
+# Maximum number of pixels read from an image at once
+_TILE_PIXELS = 4 * 1024**2
+
+# Number of histogram bins used to narrow down the value of an order statistic
+_SELECTION_BINS = 65536
+
+# Maximum number of candidate values gathered in memory to pick an order statistic
+_SELECTION_PIXELS = 4 * 1024**2
+
+# 1 / scipy.stats.norm.ppf(0.75), the factor used by astropy.stats.mad_std
+_MAD_TO_STD = 1.482602218505602
+
+
+def _tiles(data: np.ndarray = None, tile_pixels: int = _TILE_PIXELS) -> Iterator[np.ndarray]:
+    """
+    Function that splits an array into views of at most tile_pixels elements along its leading axes. Views of a
+    memory-mapped array are only read from disk when they are used.
+
+    Parameters
+    ----------
+    data :
+        Input numpy array or memory-mapped array
+    tile_pixels :
+        Maximum number of elements of each tile
+
+    Returns
+    -------
+    An iterator over the tiles
+    """
+    if data.ndim == 0:
+        yield data.reshape(1)
+        return
+    row_pixels = int(np.prod(data.shape[1:], dtype=np.int64))
+    if data.ndim > 1 and row_pixels > tile_pixels:
+        for row in data:
+            yield from _tiles(row, tile_pixels)
+        return
+    rows = max(tile_pixels // max(row_pixels, 1), 1)
+    for start in range(0, data.shape[0], rows):
+        yield data[start:start + rows]
+
+
+def _map_tiles(
+    function: Callable = None,
+    data: np.ndarray = None,
+    tile_pixels: int = _TILE_PIXELS,
+    workers: int = None
+) -> Iterator:
+    """
+    Function that applies a function to every tile of an array. With more than one worker the tiles are processed
+    by a pool of threads, in batches of one tile per worker so that memory stays bounded.
+
+    Parameters
+    ----------
+    function :
+        Function that takes a tile and returns a partial result
+    data :
+        Input numpy array or memory-mapped array
+    tile_pixels :
+        Maximum number of elements of each tile
+    workers :
+        Number of threads. Default is None, and it means to process the tiles in this thread
+
+    Returns
+    -------
+    An iterator over the partial results, in tile order
+    """
+    tiles = _tiles(data, tile_pixels)
+    if workers is None or workers < 2:
+        for tile in tiles:
+            yield function(tile)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(itertools.islice(tiles, workers))
+            if not batch:
+                return
+            yield from executor.map(function, batch)
+
+
+def _clip(tile: np.ndarray = None, lower=-np.inf, upper=np.inf) -> np.ndarray:
+    """
+    Function that returns the finite values of a tile that lie within clipping bounds
+
+    Parameters
+    ----------
+    tile :
+        Tile of an image
+    lower :
+        Lowest value kept
+    upper :
+        Highest value kept
+
+    Returns
+    -------
+    A flat numpy array with the kept values
+    """
+    tile = np.asarray(tile).ravel()
+    return tile[np.isfinite(tile) & (tile >= lower) & (tile <= upper)]
+
+
+def _select(
+    data: np.ndarray = None,
+    values: Callable = None,
+    ranks: List[int] = None,
+    lower=None,
+    upper=None,
+    below: int = 0,
+    tile_pixels: int = _TILE_PIXELS,
+    workers: int = None
+) -> List:
+    """
+    Function that returns the exact order statistics of the values derived from the tiles of an array without
+    holding them in memory. Each pass histograms the candidate values and keeps the bins that contain the ranks,
+    until the candidates are few enough to be gathered and sorted. Ranks that fall in different bins are then
+    selected separately.
+
+    Parameters
+    ----------
+    data :
+        Input numpy array or memory-mapped array
+    values :
+        Function that returns the flat array of values of a tile
+    ranks :
+        Sorted zero-based ranks of the order statistics
+    lower :
+        Minimum of the candidate values
+    upper :
+        Maximum of the candidate values
+    below :
+        Number of values lower than the candidate values
+    tile_pixels :
+        Maximum number of elements of each tile
+    workers :
+        Number of threads
+
+    Returns
+    -------
+    list:
+        A list with the value of each rank
+    """
+    while True:
+        if lower == upper:
+            return [lower] * len(ranks)
+        low = float(lower)
+        scale = _SELECTION_BINS / (float(upper) - low)
+
+        def bins(v, lower=lower, upper=upper, low=low, scale=scale):
+            v = v[(v >= lower) & (v <= upper)]
+            index = ((v.astype(np.float64) - low) * scale).astype(np.int64)
+            return v, np.minimum(index, _SELECTION_BINS - 1)
+
+        histogram = np.zeros(_SELECTION_BINS, dtype=np.int64)
+        for counts in _map_tiles(
+            lambda tile: np.bincount(bins(values(tile))[1], minlength=_SELECTION_BINS), data,
+            tile_pixels, workers
+        ):
+            histogram += counts
+        cumulative = np.cumsum(histogram)
+        first = int(np.searchsorted(cumulative, ranks[0] - below, side="right"))
+        last = int(np.searchsorted(cumulative, ranks[-1] - below, side="right"))
+        before = int(cumulative[first - 1]) if first > 0 else 0
+
+        def candidates(tile, first=first, last=last):
+            v, index = bins(values(tile))
+            return v[(index >= first) & (index <= last)]
+
+        below += before
+        if cumulative[last] - before <= _SELECTION_PIXELS:
+            gathered = np.sort(
+                np.concatenate(list(_map_tiles(candidates, data, tile_pixels, workers)))
+            )
+            return [gathered[rank - below] for rank in ranks]
+        if first != last:
+            return [
+                value for rank in ranks for value in
+                _select(data, values, [rank], lower, upper, below - before, tile_pixels, workers)
+            ]
+
+        extrema = [(v.min(), v.max()) for v in _map_tiles(candidates, data, tile_pixels, workers)
+                   if v.size > 0]
+        lower = min(minimum for minimum, _ in extrema)
+        upper = max(maximum for _, maximum in extrema)
+
+
+def _median(
+    data: np.ndarray = None,
+    values: Callable = None,
+    tile_pixels: int = _TILE_PIXELS,
+    workers: int = None
+) -> tuple:
+    """
+    Function that returns the median of the values derived from the tiles of an array, as numpy.median would
+    calculate it on all the values at once
+
+    Parameters
+    ----------
+    data :
+        Input numpy array or memory-mapped array
+    values :
+        Function that returns the flat array of values of a tile
+    tile_pixels :
+        Maximum number of elements of each tile
+    workers :
+        Number of threads
+
+    Returns
+    -------
+    tuple:
+        A tuple with the median, or nan if there are no values, and the number of values
+    """
+    count = 0
+    lower = None
+    upper = None
+    for v in _map_tiles(values, data, tile_pixels, workers):
+        if v.size == 0:
+            continue
+        count += v.size
+        lower = v.min() if lower is None else min(lower, v.min())
+        upper = v.max() if upper is None else max(upper, v.max())
+    if count == 0:
+        return np.nan, 0
+
+    ranks = sorted({(count - 1) // 2, count // 2})
+    selected = _select(data, values, ranks, lower, upper, 0, tile_pixels, workers)
+    # numpy averages the two middle values of an even number of values
+    return np.median(np.array(selected, dtype=np.result_type(lower))), count
+
+
+def _count(
+    data: np.ndarray = None,
+    values: Callable = None,
+    tile_pixels: int = _TILE_PIXELS,
+    workers: int = None
+) -> int:
+    """
+    Function that returns the number of values derived from the tiles of an array
+    """
+    return sum(v.size for v in _map_tiles(values, data, tile_pixels, workers))
+
+
+def tiled_nanmax(
+    data: np.ndarray = None, tile_pixels: int = _TILE_PIXELS, workers: int = None
+) -> float:
+    """
+    Function that calculates the maximum of an array discarding nan values, reading it in tiles
+
+    Parameters
+    ----------
+    data :
+        Input numpy array or memory-mapped array
+    tile_pixels :
+        Maximum number of elements read at once
+    workers :
+        Number of threads. Default is None, and it means a single thread
+
+    Returns
+    -------
+    The maximum of the array, or nan if every value is nan
+    """
+    peak = None
+    for tile_peak in _map_tiles(
+        lambda tile: np.fmax.reduce(np.asarray(tile).ravel()), data, tile_pixels, workers
+    ):
+        peak = tile_peak if peak is None else np.fmax(peak, tile_peak)
+    return np.nan if peak is None else peak
+
+
+def tiled_nanrms(
+    data: np.ndarray = None, tile_pixels: int = _TILE_PIXELS, workers: int = None
+) -> float:
+    """
+    Function that calculates the root-mean-squared of an array discarding nan values, reading it in tiles. The
+    squares are accumulated in double precision and the result has the precision of numpy.nanmean of the array.
+
+    Parameters
+    ----------
+    data :
+        Input numpy array or memory-mapped array
+    tile_pixels :
+        Maximum number of elements read at once
+    workers :
+        Number of threads. Default is None, and it means a single thread
+
+    Returns
+    -------
+    The RMS of the array discarding nan values, or nan if every value is nan
+    """
+
+    def squares(tile):
+        tile = np.asarray(tile).ravel()
+        tile = tile[~np.isnan(tile)].astype(np.float64)
+        return np.dot(tile, tile), tile.size
+
+    dtype = data.dtype if np.issubdtype(data.dtype, np.inexact) else np.dtype(np.float64)
+    total = 0.0
+    count = 0
+    for tile_total, tile_count in _map_tiles(squares, data, tile_pixels, workers):
+        total += tile_total
+        count += tile_count
+    if count == 0:
+        return dtype.type(np.nan)
+    return np.sqrt(dtype.type(total / count))
+
+
+def sigma_clipped_std(
+    data: np.ndarray = None,
+    sigma: float = 3.0,
+    maxiters: int = 5,
+    tile_pixels: int = _TILE_PIXELS,
+    workers: int = None
+) -> float:
+    """
+    Function that calculates the standard deviation of the sigma-clipped values of an array, reading it in tiles.
+    It matches the standard deviation returned by astropy sigma_clipped_stats with cenfunc="median" and
+    stdfunc="mad_std": non-finite values are discarded and values further than sigma times the MAD standard
+    deviation from the median are clipped iteratively. The medians are exact order statistics, so the same values
+    are clipped as by astropy, and the final standard deviation is accumulated in double precision.
+
+    Parameters
+    ----------
+    data :
+        Input numpy array or memory-mapped array
+    sigma :
+        Number of standard deviations used for the lower and upper clipping limits
+    maxiters :
+        Maximum number of clipping iterations
+    tile_pixels :
+        Maximum number of elements read at once
+    workers :
+        Number of threads. Default is None, and it means a single thread
+
+    Returns
+    -------
+    The standard deviation of the clipped values, or nan if no value is left
+    """
+    lower = -np.inf
+    upper = np.inf
+    for _ in range(maxiters):
+
+        def kept(tile, lower=lower, upper=upper):
+            return _clip(tile, lower, upper)
+
+        center, count = _median(data, kept, tile_pixels, workers)
+        if count == 0:
+            break
+        mad, _ = _median(data, lambda tile: np.abs(kept(tile) - center), tile_pixels, workers)
+        std = mad * _MAD_TO_STD
+        # Each iteration clips the values kept by the previous one, so the bounds only narrow
+        lower = max(lower, center - (std * sigma))
+        upper = min(upper, center + (std * sigma))
+        if _count(data, lambda tile: _clip(tile, lower, upper), tile_pixels, workers) == count:
+            break
+
+    dtype = data.dtype if np.issubdtype(data.dtype, np.inexact) else np.dtype(np.float64)
+    total = 0.0
+    count = 0
+    for v in _map_tiles(lambda tile: _clip(tile, lower, upper), data, tile_pixels, workers):
+        total += np.sum(v, dtype=np.float64)
+        count += v.size
+    if count == 0:
+        return dtype.type(np.nan)
+    mean = total / count
+
+    def deviations(tile):
+        v = _clip(tile, lower, upper).astype(np.float64) - mean
+        return np.dot(v, v)
+
+    variance = sum(_map_tiles(deviations, data, tile_pixels, workers)) / count
+    return np.sqrt(dtype.type(variance))
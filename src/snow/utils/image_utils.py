@@ -1,14 +1,61 @@
+import hashlib
 import os
-from typing import Tuple, Union
+import re
+from typing import Iterator, Tuple, Union
 from pathlib import Path
 
+import astropy.units as u
 import numpy as np
+from astropy.coordinates import FK4, FK5, ICRS, Galactic, SkyCoord
 from astropy.io import fits
-from astropy.wcs import WCS
-from astropy.stats import sigma_clipped_stats
-from casatasks import exportfits, imstat
+from astropy.time import Time
+from astropy.units import Quantity
+from astropy.wcs import WCS, WCSCOMPARE_ANCILLARY
+from casatasks import exportfits
+from casatools import image
 from reproject import reproject_interp
 
+from .image_stats import _TILE_PIXELS, sigma_clipped_std, tiled_nanmax, tiled_nanrms
+from .ms_metadata import get_ms_metadata
+
+# Output pixels above which reprojections are computed in parallel blocks
+_REPROJECT_PARALLEL_PIXELS = 4096**2
+_REPROJECT_BLOCK_SIZE = (2048, 2048)
+
+# Absolute tolerance when comparing the world coordinate systems of two images
+_WCS_TOLERANCE = 1e-10
+
+# FITS codes of the Stokes parameters and correlations
+_STOKES_CODES = {
+    "I": 1,
+    "Q": 2,
+    "U": 3,
+    "V": 4,
+    "RR": -1,
+    "LL": -2,
+    "RL": -3,
+    "LR": -4,
+    "XX": -5,
+    "YY": -6,
+    "XY": -7,
+    "YX": -8
+}
+
+# Stokes parameters and correlations, two-letter names first so that e.g. "RR" is not read as two parameters
+_STOKES_PATTERN = re.compile("|".join(sorted(_STOKES_CODES, key=len, reverse=True)))
+
+# Astropy frames of the CASA direction reference frames that can be written to a FITS header
+_DIRECTION_FRAMES = {
+    "J2000": FK5(equinox="J2000"),
+    "ICRS": ICRS(),
+    "B1950": FK4(equinox="B1950"),
+    "GALACTIC": Galactic()
+}
+
+_header_cache = {}
+_content_hash_cache = {}
+_reproject_cache = {}
+
 
 def nanrms(x, axis=None) -> Union[np.ndarray, float]:
     """
@@ -26,6 +73,9 @@ def nanrms(x, axis=None) -> Union[np.ndarray, float]:
     -------
     The RMS of the input numpy array discarding nan values
     """
+    if axis is None:
+        # Avoids squaring the whole array into a temporary copy
+        return tiled_nanrms(np.asarray(x))
     return np.sqrt(np.nanmean(x**2, axis=axis))
 
 
@@ -136,6 +186,252 @@ def get_header_and_data(fits_name: str = "") -> Tuple[dict, np.ndarray]:
     return header, data
 
 
+def gaussian_beam_kernel(
+    major: float = None,
+    minor: float = None,
+    position_angle: float = 0.0,
+    cdelt1: float = None,
+    cdelt2: float = None,
+    truncate: float = 5.0
+) -> np.ndarray:
+    """
+    Function that samples an elliptical Gaussian restoring beam with unit peak on the pixel grid of an image. The
+    kernel has an odd number of pixels per axis and is centered on its middle pixel, so it can be used with
+    scipy.signal.fftconvolve in "same" mode.
+
+    Parameters
+    ----------
+    major :
+        Full width at half maximum of the major axis in degrees
+    minor :
+        Full width at half maximum of the minor axis in degrees
+    position_angle :
+        Position angle of the major axis in degrees, measured from north through east
+    cdelt1 :
+        Pixel size of the first (right ascension) axis in degrees, negative when east is to the left
+    cdelt2 :
+        Pixel size of the second (declination) axis in degrees
+    truncate :
+        Number of standard deviations of the major axis at which the kernel is truncated
+
+    Returns
+    -------
+    A 2D numpy array with the kernel in FITS axis order (y, x)
+    """
+    sigma_pixels = major / (2.0 * np.sqrt(2.0 * np.log(2.0))) / min(abs(cdelt1), abs(cdelt2))
+    half = int(np.ceil(truncate * sigma_pixels))
+    y, x = np.mgrid[-half:half + 1, -half:half + 1]
+    east = x * cdelt1
+    north = y * cdelt2
+    angle = np.deg2rad(position_angle)
+    along_major = east * np.sin(angle) + north * np.cos(angle)
+    along_minor = east * np.cos(angle) - north * np.sin(angle)
+    return np.exp(-4.0 * np.log(2.0) * ((along_major / major)**2 + (along_minor / minor)**2))
+
+
+def _parse_phase_center(phase_center: Union[str, int] = "", metadata=None) -> Tuple[float, float, str]:
+    """
+    Function that returns the direction of a tclean phase center
+
+    Parameters
+    ----------
+    phase_center :
+        Field id, field name or direction such as "J2000 19h59m28.5s +40d44m02.0s". An empty string means the first
+        field
+    metadata :
+        Metadata of the measurement set
+
+    Returns
+    -------
+    A tuple with the right ascension and declination in degrees and the FITS RADESYS of the image, "ICRS" for ICRS
+    directions and "FK5" for the other frames, which are converted to J2000
+
+    Raises
+    ------
+    ValueError:
+        If the phase center cannot be parsed or its reference frame is not supported
+    """
+    phase_center = str(phase_center).strip()
+    if phase_center == "" or phase_center.isdigit() or phase_center in metadata.field_names:
+        if phase_center == "":
+            field_id = 0
+        elif phase_center.isdigit():
+            field_id = int(phase_center)
+        else:
+            field_id = metadata.field_names.index(phase_center)
+        lon, lat = np.rad2deg(metadata.field_phase_dirs[field_id])
+        frame = metadata.field_frame.upper()
+        if frame not in _DIRECTION_FRAMES:
+            raise ValueError(
+                "Reference frame {0} of field {1} is not supported".format(frame, field_id)
+            )
+        coordinate = SkyCoord(lon % 360.0, lat, unit=(u.deg, u.deg), frame=_DIRECTION_FRAMES[frame])
+    else:
+        tokens = phase_center.split()
+        frame = "J2000"
+        if len(tokens) == 3:
+            frame = tokens.pop(0).upper()
+        elif len(tokens) != 2:
+            raise ValueError("Phase center {0} cannot be parsed".format(phase_center))
+        if frame not in _DIRECTION_FRAMES:
+            raise ValueError("Reference frame {0} is not supported".format(frame))
+        lon, lat = tokens
+        # CASA writes sexagesimal declinations with dots, e.g. +40.44.02.0
+        if lat.count(".") > 1:
+            lat = lat.replace(".", ":", 2)
+        if ":" in lon and frame != "GALACTIC":
+            unit = (u.hourangle, u.deg)
+        else:
+            unit = (u.deg, u.deg)
+        coordinate = SkyCoord(lon, lat, unit=unit, frame=_DIRECTION_FRAMES[frame])
+
+    if frame == "ICRS":
+        return float(coordinate.ra.deg), float(coordinate.dec.deg), "ICRS"
+    coordinate = coordinate.transform_to(_DIRECTION_FRAMES["J2000"])
+    return float(coordinate.ra.deg), float(coordinate.dec.deg), "FK5"
+
+
+def _stokes_codes(stokes: str = "I") -> list:
+    """
+    Function that returns the FITS codes of a selection of Stokes parameters or correlations, such as "IQUV",
+    "RRLL" or "XXYY"
+
+    Parameters
+    ----------
+    stokes :
+        Stokes parameters or correlations of the image
+
+    Returns
+    -------
+    A list with the FITS code of each parameter
+
+    Raises
+    ------
+    ValueError:
+        If the selection cannot be parsed or cannot be described by a linear STOKES axis
+    """
+    names = _STOKES_PATTERN.findall(stokes.upper())
+    if not names or "".join(names) != stokes.upper():
+        raise ValueError("Stokes parameters {0} cannot be parsed".format(stokes))
+    codes = [_STOKES_CODES[name] for name in names]
+    step = 1 if codes[0] > 0 else -1
+    if codes != list(range(codes[0], codes[0] + step * len(codes), step)):
+        raise ValueError(
+            "Stokes parameters {0} are not consecutive, so they cannot be written as a FITS STOKES "
+            "axis".format(stokes)
+        )
+    return codes
+
+
+def create_image_header(
+    ms_name: str = "",
+    cell: Union[str, list] = "",
+    M: int = None,
+    N: int = None,
+    phase_center: Union[str, int] = "",
+    reference_freq: Union[str, float, Quantity, None] = None,
+    stokes: str = "I"
+) -> fits.Header:
+    """
+    Function that builds the FITS header of the image tclean would make for a measurement set, from the FIELD and
+    SPECTRAL_WINDOW tables and the imaging parameters, without imaging. Axes follow the CASA convention once
+    exported: RA---SIN, DEC--SIN, FREQ and STOKES, with the reference pixel at M/2 + 1 and N/2 + 1.
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+    cell :
+        Cell size, e.g. "0.5arcsec" or ["0.5arcsec", "0.5arcsec"]
+    M :
+        Number of pixels in the x-axis
+    N :
+        Number of pixels in the y-axis
+    phase_center :
+        Phase center as accepted by tclean. An empty string means the phase center of the first field
+    reference_freq :
+        Reference frequency. Default is None, and it means the middle of the frequency range, as in tclean mfs
+    stokes :
+        Stokes parameters or correlations of the image, e.g. "I", "IQUV" or "RRLL"
+
+    Returns
+    -------
+    The FITS header
+
+    Raises
+    ------
+    ValueError:
+        If the phase center or the Stokes parameters cannot be written to a FITS header
+    """
+    metadata = get_ms_metadata(ms_name)
+    if isinstance(cell, (list, tuple)):
+        cell_x, cell_y = [Quantity(c).to(u.deg).value for c in cell]
+    else:
+        cell_x = cell_y = Quantity(cell).to(u.deg).value
+    ra, dec, radesys = _parse_phase_center(phase_center, metadata)
+
+    min_freq = min(freq_range[0] for freq_range in metadata.spw_freq_range)
+    max_freq = max(freq_range[1] for freq_range in metadata.spw_freq_range)
+    if reference_freq is None or reference_freq == "":
+        reference_freq = (min_freq + max_freq) / 2.0
+    elif isinstance(reference_freq, Quantity):
+        reference_freq = reference_freq.to(u.Hz).value
+    elif isinstance(reference_freq, str):
+        reference_freq = Quantity(reference_freq)
+        if reference_freq.unit == u.dimensionless_unscaled:
+            reference_freq = reference_freq * u.Hz
+        reference_freq = reference_freq.to(u.Hz).value
+
+    stokes_codes = _stokes_codes(stokes)
+
+    header = fits.Header()
+    header["SIMPLE"] = True
+    header["BITPIX"] = -32
+    header["NAXIS"] = 4
+    header["NAXIS1"] = M
+    header["NAXIS2"] = N
+    header["NAXIS3"] = 1
+    header["NAXIS4"] = len(stokes_codes)
+    header["BSCALE"] = 1.0
+    header["BZERO"] = 0.0
+    header["BTYPE"] = "Intensity"
+    header["OBJECT"] = metadata.field_names[0] if metadata.field_names else ""
+    header["BUNIT"] = "Jy/beam"
+    if radesys == "FK5":
+        header["EQUINOX"] = 2000.0
+    header["RADESYS"] = radesys
+    header["LONPOLE"] = 180.0
+    header["LATPOLE"] = dec
+    header["CTYPE1"] = "RA---SIN"
+    header["CRVAL1"] = ra
+    header["CDELT1"] = -cell_x
+    header["CRPIX1"] = float(M // 2 + 1)
+    header["CUNIT1"] = "deg"
+    header["CTYPE2"] = "DEC--SIN"
+    header["CRVAL2"] = dec
+    header["CDELT2"] = cell_y
+    header["CRPIX2"] = float(N // 2 + 1)
+    header["CUNIT2"] = "deg"
+    header["CTYPE3"] = "FREQ"
+    header["CRVAL3"] = float(reference_freq)
+    header["CDELT3"] = max(max_freq - min_freq, 1.0)
+    header["CRPIX3"] = 1.0
+    header["CUNIT3"] = "Hz"
+    header["CTYPE4"] = "STOKES"
+    header["CRVAL4"] = float(stokes_codes[0])
+    header["CDELT4"] = float(np.sign(stokes_codes[0]))
+    header["CRPIX4"] = 1.0
+    header["CUNIT4"] = ""
+    header["PV2_1"] = 0.0
+    header["PV2_2"] = 0.0
+    header["RESTFRQ"] = float(reference_freq)
+    header["SPECSYS"] = "LSRK"
+    if metadata.time_range:
+        header["DATE-OBS"] = Time(metadata.time_range[0] / 86400.0, format="mjd", scale="utc").isot
+        header["TIMESYS"] = "UTC"
+    return header
+
+
 def export_ms_to_fits(msname: str = "") -> str:
     """
     Function that export a CASA image file to a FITS image
@@ -154,16 +450,62 @@ def export_ms_to_fits(msname: str = "") -> str:
     return fitsfile_name
 
 
+def calculate_psnr_arrays(
+    signal_data: np.ndarray = None,
+    residual_data: np.ndarray = None,
+    pixels: int = None,
+    sigma: float = 5,
+    use_sigma_clipped_stats: bool = True,
+    workers: int = None,
+) -> Tuple[float, float, float]:
+    """
+    Function that calculates the peak signal-to-noise ratio of a reconstruction with images held as numpy or
+    memory-mapped arrays in FITS axis order. The peak is calculated from the restored image, the RMS is calculated
+    in area of the residual image.
+
+    Parameters
+    ----------
+    signal_data :
+        The restored image
+    residual_data :
+        The residual image
+    pixels :
+        Number of pixels on where to calculate the RMS
+    sigma:
+        Number of sigma noise values to calculate the noise in the residual image
+    use_sigma_clipped_stats:
+        Whether to calculate the noise as astropy sigma_clipped_stats with stdfunc="mad_std" does
+    workers:
+        Number of threads used to reduce the tiles. Default is None, and it means a single thread
+
+    Returns
+    -------
+    tuple:
+        A tuple with the peak signal-to-noise, the peak and the RMS
+    """
+    res_data = residual_data.squeeze()
+    if use_sigma_clipped_stats:
+        noise = sigma_clipped_std(res_data[0:pixels, 0:pixels], sigma=sigma, workers=workers)
+    else:
+        noise = tiled_nanrms(res_data[0:pixels, 0:pixels], workers=workers)
+    peak = tiled_nanmax(signal_data.squeeze(), workers=workers)
+    peak_signal_to_noise = peak / noise
+
+    return peak_signal_to_noise, peak, noise
+
+
 def calculate_psnr_fits(
     signal_fits_name: str = "",
     residual_fits_name: str = "",
     pixels: int = None,
     sigma: float = 5,
     use_sigma_clipped_stats: bool = True,
+    workers: int = None,
 ) -> Tuple[float, float, float]:
     """
     Function that calculates the peak signal-to-noise ratio of a reconstruction with images resulting in FITS files.
-    The peak is calculated from the restored image, the RMS is calculated in area of the residual image.
+    The peak is calculated from the restored image, the RMS is calculated in area of the residual image. The images
+    are memory-mapped and read in tiles, so memory use does not grow with the image size.
 
     Parameters
     ----------
@@ -176,26 +518,60 @@ def calculate_psnr_fits(
     sigma:
         Number of sigma noise values to calculate the noise in the residual image
     use_sigma_clipped_stats:
-        Whether to use astropy sigma_clipped_stats to calculate the mad_std of the residual image
+        Whether to calculate the noise as astropy sigma_clipped_stats with stdfunc="mad_std" does
+    workers:
+        Number of threads used to read and reduce the tiles. Default is None, and it means a single thread
 
     Returns
     -------
     tuple:
         A tuple with the peak signal-to-noise, the peak and the RMS
     """
-    signal_data = get_data(signal_fits_name)
-    res_data = get_data(residual_fits_name)
-
-    if use_sigma_clipped_stats:
-        _, _, noise = sigma_clipped_stats(
-            data=res_data[0:pixels, 0:pixels], sigma=sigma, stdfunc="mad_std"
+    with fits.open(signal_fits_name, memmap=True) as signal_hdul, \
+            fits.open(residual_fits_name, memmap=True) as residual_hdul:
+        return calculate_psnr_arrays(
+            signal_hdul[0].data, residual_hdul[0].data, pixels, sigma, use_sigma_clipped_stats,
+            workers
         )
-    else:
-        noise = nanrms(res_data[0:pixels, 0:pixels])
-    peak = np.nanmax(signal_data)
-    peak_signal_to_noise = peak / noise
 
-    return peak_signal_to_noise, peak, noise
+
+def iterate_casa_image(image_name: str = "",
+                       pixels: int = None,
+                       tile_pixels: int = _TILE_PIXELS) -> Iterator[np.ndarray]:
+    """
+    Function that reads a CASA image in chunks of rows with the image tool, without running a task or exporting it
+    to FITS. Pixels that are masked or not finite are discarded, as imstat does.
+
+    Parameters
+    ----------
+    image_name :
+        Absolute path to the CASA image
+    pixels :
+        Number of pixels of the box in the first two axes starting at pixel (0, 0). Default is None, and it means
+        the whole image
+    tile_pixels :
+        Approximate number of pixels read at once
+
+    Returns
+    -------
+    An iterator over flat numpy arrays with the valid pixel values of each chunk
+    """
+    ia = image()
+    ia.open(image_name)
+    try:
+        shape = list(ia.shape())
+        nx = shape[0] if pixels is None else min(pixels, shape[0])
+        ny = shape[1] if pixels is None else min(pixels, shape[1])
+        other_pixels = int(np.prod(shape[2:], dtype=np.int64))
+        rows = max(tile_pixels // (nx * other_pixels), 1)
+        for y in range(0, ny, rows):
+            blc = [0, y] + [0] * (len(shape) - 2)
+            trc = [nx - 1, min(y + rows, ny) - 1] + [axis - 1 for axis in shape[2:]]
+            data = ia.getchunk(blc=blc, trc=trc)
+            mask = ia.getchunk(blc=blc, trc=trc, getmask=True)
+            yield data[mask & np.isfinite(data)]
+    finally:
+        ia.done()
 
 
 def calculate_psnr_ms(signal_ms_name: str = "",
@@ -203,7 +579,8 @@ def calculate_psnr_ms(signal_ms_name: str = "",
                       pixels: int = None) -> Tuple[float, float, float]:
     """
     Function that calculates the peak signal-to-noise ratio of a reconstruction with images resulting in CASA files.
-    The peak is calculated from the restored image, the RMS is calculated in area of the residual image.
+    The peak is calculated from the restored image, the RMS is calculated in area of the residual image. Both images
+    are read in chunks in this process, so the results match imstat without its task overhead.
 
     Parameters
     ----------
@@ -219,23 +596,114 @@ def calculate_psnr_ms(signal_ms_name: str = "",
     tuple:
         A tuple with the peak signal-to-noise, the peak and the RMS
     """
-    box = ""
-    if pixels is not None:
-        box = "0,0," + str(pixels - 1) + "," + str(pixels - 1)
-
-    stats_signal = imstat(signal_ms_name, box=box)
-    stats_residuals = imstat(residual_ms_name, box=box)
-    peak = stats_signal["max"][0]
-    stdv = stats_residuals["rms"][0]
+    peak = -np.inf
+    for values in iterate_casa_image(signal_ms_name, pixels):
+        if values.size > 0:
+            peak = max(peak, float(np.max(values)))
+
+    squares = 0.0
+    count = 0
+    for values in iterate_casa_image(residual_ms_name, pixels):
+        values = values.astype(np.float64)
+        squares += np.dot(values, values)
+        count += values.size
+    stdv = np.sqrt(squares / count) if count > 0 else np.nan
     psnr = peak / stdv
     return psnr, peak, stdv
 
 
+def _file_stamp(file_name: str = "") -> tuple:
+    """
+    Function that returns the absolute path, the modification time in nanoseconds and the size of a file
+    """
+    stat = os.stat(file_name)
+    return os.path.abspath(file_name), stat.st_mtime_ns, stat.st_size
+
+
+def _get_cached_header(fits_name: str = "") -> fits.Header:
+    """
+    Function that returns a copy of the header of a FITS file, reading it only when the file has changed
+
+    Parameters
+    ----------
+    fits_name :
+        Absolute path to the FITS file
+
+    Returns
+    -------
+    The FITS header
+    """
+    stamp = _file_stamp(fits_name)
+    header = _header_cache.get(stamp[0])
+    if header is None or header[0] != stamp:
+        header = (stamp, get_header(fits_name))
+        _header_cache[stamp[0]] = header
+    return header[1].copy()
+
+
+def _content_hash(file_name: str = "") -> str:
+    """
+    Function that returns the SHA-256 digest of the content of a file, hashing it only when the file has changed
+
+    Parameters
+    ----------
+    file_name :
+        Absolute path to the file
+
+    Returns
+    -------
+    The hexadecimal digest
+    """
+    stamp = _file_stamp(file_name)
+    digest = _content_hash_cache.get(stamp[0])
+    if digest is None or digest[0] != stamp:
+        sha256 = hashlib.sha256()
+        with open(file_name, "rb") as f:
+            for block in iter(lambda: f.read(1024**2), b""):
+                sha256.update(block)
+        digest = (stamp, sha256.hexdigest())
+        _content_hash_cache[stamp[0]] = digest
+    return digest[1]
+
+
+def same_pixel_grid(header: fits.Header = None, other_header: fits.Header = None) -> bool:
+    """
+    Function that returns True if two FITS headers describe the same celestial pixel grid
+
+    Parameters
+    ----------
+    header :
+        FITS header of the first image
+    other_header :
+        FITS header of the second image
+
+    Returns
+    -------
+    True if both images have the same size and celestial world coordinate system, False otherwise
+    """
+    if (header["NAXIS1"], header["NAXIS2"]) != (other_header["NAXIS1"], other_header["NAXIS2"]):
+        return False
+    return WCS(header=header, naxis=2).wcs.compare(
+        WCS(header=other_header, naxis=2).wcs, cmp=WCSCOMPARE_ANCILLARY, tolerance=_WCS_TOLERANCE
+    )
+
+
+def clear_reproject_cache() -> None:
+    """
+    Function that empties the in-memory caches of FITS headers and reprojected images
+    """
+    _header_cache.clear()
+    _content_hash_cache.clear()
+    _reproject_cache.clear()
+
+
 def reproject(fits_file_to_resamp: str = "",
               fits_file_model: str = "",
               order: str = "bilinear") -> Union[str, None]:
     """
-    Function that reprojects an image if two images does not have the same size or pixel-size
+    Function that reprojects an image if two images does not have the same size or pixel-size. Reprojections are
+    cached by the content of the image to resample, the target grid and the order, so the same pair is only
+    resampled once per process.
 
     Parameters
     ----------
@@ -252,32 +720,48 @@ def reproject(fits_file_to_resamp: str = "",
     Returns
     -------
     str:
-        A string with the absolute path of the reproject image file
+        A string with the absolute path of the reproject image file, or None if both images already have the same
+        pixel grid
     """
     if os.path.exists(fits_file_to_resamp) and os.path.exists(fits_file_model):
-        header_mask = get_header(fits_file_to_resamp)
-        data_mask = get_data(fits_file_to_resamp)
-        header_model = get_header(fits_file_model)
+        header_mask = _get_cached_header(fits_file_to_resamp)
+        header_model = _get_cached_header(fits_file_model)
+        if same_pixel_grid(header_mask, header_model):
+            return None
+
         model_WCS = WCS(header=header_model, naxis=2)
         mask_WCS = WCS(header=header_mask, naxis=2)
 
         model_M = header_model['NAXIS1']
         model_N = header_model['NAXIS2']
-        model_dy = header_model['CDELT2']
+
+        key = (
+            _content_hash(fits_file_to_resamp), model_WCS.to_header_string(), model_M, model_N,
+            order
+        )
+        cached = _reproject_cache.get(key)
+        if cached is not None and os.path.exists(cached[0]) and _file_stamp(cached[0]) == cached[1]:
+            return cached[0]
+
+        block_arguments = {}
+        if model_M * model_N > _REPROJECT_PARALLEL_PIXELS:
+            block_arguments = {"parallel": True, "block_size": _REPROJECT_BLOCK_SIZE}
 
         print("Resampling image...")
         reprojected_array = reproject_interp(
-            (data_mask, mask_WCS),
+            (get_data(fits_file_to_resamp), mask_WCS),
             model_WCS,
             return_footprint=False,
             order=order,
-            shape_out=(model_M, model_N)
+            shape_out=(model_N, model_M),
+            **block_arguments
         )
         path_object = Path(fits_file_to_resamp)
         resampled_mask_name = "{0}_{2}{1}".format(
             Path.joinpath(path_object.parent, path_object.stem), path_object.suffix, "resampled"
         )
         fits.writeto(resampled_mask_name, reprojected_array, header_model, overwrite=True)
+        _reproject_cache[key] = (resampled_mask_name, _file_stamp(resampled_mask_name))
 
         return resampled_mask_name
 
@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import casatasks
+
+# Directory where partition stores the sub-measurement sets of a Multi-MS
+_SUBMS_DIRECTORY = "SUBMSS"
+
+
+def is_mms(ms_name: str = "") -> bool:
+    """
+    Function that returns True if a measurement set is a Multi-MS
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+
+    Returns
+    -------
+    True if the measurement set has sub-measurement sets, False otherwise
+    """
+    return os.path.isdir(os.path.join(ms_name, _SUBMS_DIRECTORY))
+
+
+def list_subms(ms_name: str = "") -> List[str]:
+    """
+    Function that returns the sub-measurement sets of a Multi-MS
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the Multi-MS
+
+    Returns
+    -------
+    list:
+        A sorted list with the absolute paths to the sub-measurement sets, or an empty list if the measurement set is
+        not a Multi-MS
+    """
+    if not is_mms(ms_name):
+        return []
+    subms_directory = os.path.join(ms_name, _SUBMS_DIRECTORY)
+    return sorted(
+        os.path.join(subms_directory, entry) for entry in os.listdir(subms_directory)
+        if os.path.isdir(os.path.join(subms_directory, entry))
+    )
+
+
+def _is_mpi_enabled() -> bool:
+    """
+    Function that returns True if this process is the client of a CASA MPI session
+    """
+    try:
+        from casampi.MPIEnvironment import MPIEnvironment
+        return MPIEnvironment.is_mpi_enabled
+    except ImportError:
+        return False
+
+
+def _run_task(task_name: str = "", vis: str = "", kwargs: dict = None):
+    """
+    Function that runs a CASA task on a measurement set. It is executed inside a worker process.
+
+    Parameters
+    ----------
+    task_name :
+        Name of the task in casatasks
+    vis :
+        Absolute path to the measurement set
+    kwargs :
+        Task arguments other than vis
+    """
+    return getattr(casatasks, task_name)(vis=vis, **kwargs)
+
+
+def run_on_subms(task_name: str = "", vis: str = "", workers: int = None, **kwargs) -> None:
+    """
+    Function that runs a CASA task on every sub-measurement set of a Multi-MS at the same time. If this process is
+    the client of a CASA MPI session, the task is called once on the Multi-MS and CASA distributes it over the MPI
+    servers. Otherwise each sub-measurement set is processed by its own local worker process. If the measurement set
+    is not a Multi-MS the task is run on it directly.
+
+    Flag backups are not supported by the local workers, since each one would write its own flag versions.
+
+    Parameters
+    ----------
+    task_name :
+        Name of the task in casatasks, e.g. "applycal", "flagdata" or "statwt"
+    vis :
+        Absolute path to the measurement set
+    workers :
+        Maximum number of worker processes. Default is None, and it means
+        min(number of sub-measurement sets, number of cpus)
+    kwargs :
+        Task arguments other than vis
+    """
+    subms = list_subms(vis)
+    if len(subms) < 2 or _is_mpi_enabled():
+        getattr(casatasks, task_name)(vis=vis, **kwargs)
+        return
+
+    if "flagbackup" in kwargs:
+        kwargs["flagbackup"] = False
+    if workers is None:
+        workers = min(len(subms), os.cpu_count())
+
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = [executor.submit(_run_task, task_name, ms, kwargs) for ms in subms]
+        for future in futures:
+            future.result()
@@ -0,0 +1,241 @@
+import json
+import os
+from dataclasses import asdict, dataclass
+from dataclasses import field as _field
+
+import numpy as np
+from casatools import table
+
+tb = table()
+
+# Tables whose modification stamps invalidate the cached metadata
+_STAMPED_TABLES = ("", "ANTENNA", "FIELD", "SPECTRAL_WINDOW", "SOURCE")
+
+# Name of the sidecar file inside the measurement set directory, so it is removed, copied and counted with it
+_SIDECAR_NAME = "snow_metadata.json"
+
+_metadata_cache = {}
+
+
+@dataclass(init=True, repr=True)
+class MSMetadata:
+    """
+    Summary of a measurement set collected in a single pass
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+    columns :
+        Column names of the main table
+    nrows :
+        Number of rows of the main table
+    virtual_model :
+        Whether a virtual model is stored in the measurement set or not
+    antenna_names :
+        Names of the antennas
+    antenna_flags :
+        FLAG_ROW of each antenna
+    spw_nchan :
+        Number of channels of each spectral window
+    spw_ref_freq :
+        Reference frequency of each spectral window in Hz
+    spw_freq_range :
+        Minimum and maximum channel frequency of each spectral window in Hz
+    field_names :
+        Names of the fields
+    field_phase_dirs :
+        Phase direction (RA, Dec) of each field in radians
+    field_frame :
+        Reference frame of the phase directions, e.g. "J2000" or "ICRS"
+    scans :
+        Scan numbers
+    integration_time :
+        Median integration time in seconds
+    time_range :
+        Start and end time of the observation in MJD seconds
+    stamps :
+        Modification stamps of the tables the metadata was collected from
+    """
+    ms_name: str = ""
+    columns: list = _field(default_factory=list)
+    nrows: int = 0
+    virtual_model: bool = False
+    antenna_names: list = _field(default_factory=list)
+    antenna_flags: list = _field(default_factory=list)
+    spw_nchan: list = _field(default_factory=list)
+    spw_ref_freq: list = _field(default_factory=list)
+    spw_freq_range: list = _field(default_factory=list)
+    field_names: list = _field(default_factory=list)
+    field_phase_dirs: list = _field(default_factory=list)
+    field_frame: str = "J2000"
+    scans: list = _field(default_factory=list)
+    integration_time: float = 0.0
+    time_range: list = _field(default_factory=list)
+    stamps: dict = _field(default_factory=dict)
+
+    @property
+    def nantennas(self) -> int:
+        return int(np.count_nonzero(~np.asarray(self.antenna_flags, dtype=bool)))
+
+    @property
+    def nspw(self) -> int:
+        return len(self.spw_nchan)
+
+
+def _table_stamps(ms_name: str = "") -> dict:
+    """
+    Function that returns the modification stamps of the main table and the subtables used for the metadata. For a
+    Multi-MS the main tables of the sub-measurement sets are included, since columns are added to them
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+
+    Returns
+    -------
+    A dictionary with the modification time in nanoseconds of each table.dat file
+    """
+    stamps = {}
+    subtables = list(_STAMPED_TABLES)
+    subms_directory = os.path.join(ms_name, "SUBMSS")
+    if os.path.isdir(subms_directory):
+        subtables += [os.path.join("SUBMSS", entry) for entry in sorted(os.listdir(subms_directory))]
+    for subtable in subtables:
+        table_dat = os.path.join(ms_name, subtable, "table.dat")
+        stamps[subtable] = os.stat(table_dat).st_mtime_ns if os.path.exists(table_dat) else None
+    return stamps
+
+
+def _sidecar_file(ms_name: str = "") -> str:
+    return os.path.join(ms_name, _SIDECAR_NAME)
+
+
+def _read_metadata(ms_name: str = "") -> MSMetadata:
+    """
+    Function that reads the metadata of a measurement set from its tables
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+
+    Returns
+    -------
+    The metadata of the measurement set
+    """
+    metadata = MSMetadata(ms_name=ms_name, stamps=_table_stamps(ms_name))
+
+    tb.open(tablename=ms_name)
+    metadata.columns = list(tb.colnames())
+    metadata.nrows = int(tb.nrows())
+    # Virtual models are referenced by definedmodel_field_<id> keywords of the main table
+    metadata.virtual_model = any(
+        keyword.startswith("definedmodel_field_") for keyword in tb.keywordnames()
+    )
+    tb.close()
+
+    if metadata.nrows > 0:
+        query_table = tb.taql(
+            "select gmin(TIME) as TMIN, gmax(TIME) as TMAX, gmedian(INTERVAL) as TINT from " +
+            ms_name
+        )
+        metadata.time_range = [
+            float(query_table.getcol("TMIN")[0]),
+            float(query_table.getcol("TMAX")[0])
+        ]
+        metadata.integration_time = float(query_table.getcol("TINT")[0])
+        query_table.close()
+
+        query_table = tb.taql("select distinct SCAN_NUMBER from " + ms_name)
+        metadata.scans = sorted(int(scan) for scan in query_table.getcol("SCAN_NUMBER"))
+        query_table.close()
+
+    tb.open(tablename=ms_name + "/ANTENNA")
+    metadata.antenna_names = list(tb.getcol("NAME"))
+    metadata.antenna_flags = [bool(flag) for flag in tb.getcol("FLAG_ROW")]
+    tb.close()
+
+    tb.open(tablename=ms_name + "/SPECTRAL_WINDOW")
+    metadata.spw_nchan = [int(nchan) for nchan in tb.getcol("NUM_CHAN")]
+    metadata.spw_ref_freq = [float(freq) for freq in tb.getcol("REF_FREQUENCY")]
+    for row in range(0, tb.nrows()):
+        chan_freq = tb.getcell("CHAN_FREQ", row)
+        metadata.spw_freq_range.append([float(np.min(chan_freq)), float(np.max(chan_freq))])
+    tb.close()
+
+    tb.open(tablename=ms_name + "/FIELD")
+    metadata.field_names = list(tb.getcol("NAME"))
+    phase_dirs = tb.getcol("PHASE_DIR")
+    metadata.field_phase_dirs = [
+        [float(phase_dirs[0, 0, i]), float(phase_dirs[1, 0, i])] for i in range(phase_dirs.shape[-1])
+    ]
+    measinfo = tb.getcolkeyword("PHASE_DIR", "MEASINFO")
+    if isinstance(measinfo, dict) and "Ref" in measinfo:
+        metadata.field_frame = str(measinfo["Ref"])
+    tb.close()
+
+    return metadata
+
+
+def get_ms_metadata(ms_name: str = "", use_sidecar: bool = True) -> MSMetadata:
+    """
+    Function that returns the metadata of a measurement set. The metadata is cached in memory and in a sidecar
+    JSON file inside the measurement set directory. Both caches are keyed by the modification stamps of the tables, so
+    they are refreshed whenever a column is added or the antenna, field or spectral window tables change.
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+    use_sidecar :
+        Whether to read and write the sidecar file or not
+
+    Returns
+    -------
+    The metadata of the measurement set
+    """
+    if ms_name == "":
+        raise ValueError("Measurement Set File cannot be empty")
+    if not os.path.exists(ms_name):
+        raise FileNotFoundError("The Measurement Set File does not exist")
+
+    key = os.path.abspath(ms_name)
+    stamps = _table_stamps(ms_name)
+
+    metadata = _metadata_cache.get(key)
+    if metadata is not None and metadata.stamps == stamps:
+        return metadata
+
+    sidecar_file = _sidecar_file(ms_name)
+    if use_sidecar and os.path.exists(sidecar_file):
+        try:
+            with open(sidecar_file, "r") as f:
+                metadata = MSMetadata(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            metadata = None
+        if metadata is not None and metadata.stamps == stamps:
+            metadata.ms_name = ms_name
+            _metadata_cache[key] = metadata
+            return metadata
+
+    metadata = _read_metadata(ms_name)
+    _metadata_cache[key] = metadata
+    if use_sidecar:
+        # The file is replaced rather than rewritten, so a snapshot that hardlinks it keeps its own copy
+        temporary_file = sidecar_file + ".tmp"
+        try:
+            with open(temporary_file, "w") as f:
+                json.dump(asdict(metadata), f)
+            os.replace(temporary_file, sidecar_file)
+        except OSError:
+            pass
+    return metadata
+
+
+def clear_ms_metadata_cache() -> None:
+    """
+    Function that empties the in-memory cache of measurement set metadata
+    """
+    _metadata_cache.clear()
@@ -0,0 +1,102 @@
+from typing import List
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+def plot_caltable_solutions(
+    solutions: dict = None,
+    figfile_name: str = "",
+    yaxis: str = "phase",
+    iteration: str = "antenna",
+    antenna: str = "",
+    subplot: list = [1, 1],
+    plotrange: list = []
+) -> List[str]:
+    """
+    Function that plots gain solutions against time into PNG files using the non-interactive Agg backend.
+    Only Figure objects are used, so it is safe to call it from a background thread.
+
+    Parameters
+    ----------
+    solutions :
+        Solutions as returned by read_caltable
+    figfile_name :
+        Absolute path to the output PNG file. If there are more panels than fit in a page, the following pages are
+        written to figfile_name with the page number appended before the extension
+    yaxis :
+        Quantity to plot: "phase" (degrees) or "amp"
+    iteration :
+        Whether to plot each antenna in its own panel ("antenna") or every antenna in a single panel ("")
+    antenna :
+        Comma separated antenna names to plot. Default is "", and it means every antenna
+    subplot :
+        Number of rows and columns of panels per page
+    plotrange :
+        [xmin, xmax, ymin, ymax] of the panels with time in hours since the first solution. If the minimum and maximum
+        of an axis are equal, that axis is autoscaled
+
+    Returns
+    -------
+    list:
+        A list with the absolute paths to the written PNG files
+    """
+    gains = solutions["CPARAM"]
+    flags = solutions["FLAG"]
+    time_hours = (solutions["TIME"] - solutions["TIME"].min()) / 3600.0
+    antenna_names = solutions["ANTENNA_NAMES"]
+
+    if yaxis == "phase":
+        values = np.degrees(np.angle(gains))
+        ylabel = "Phase [deg]"
+    else:
+        values = np.abs(gains)
+        ylabel = "Amplitude"
+    values = np.where(flags, np.nan, values)
+
+    antenna_ids = np.unique(solutions["ANTENNA1"])
+    if antenna != "":
+        selected = [name.strip() for name in antenna.split(",")]
+        antenna_ids = [i for i in antenna_ids if antenna_names[i] in selected]
+
+    if iteration == "antenna":
+        panels = [[i] for i in antenna_ids]
+    else:
+        panels = [list(antenna_ids)]
+
+    nrows, ncols = subplot
+    per_page = nrows * ncols
+    written_files = []
+    for page, first_panel in enumerate(range(0, len(panels), per_page)):
+        fig = Figure(figsize=(4.0 * ncols, 2.5 * nrows))
+        FigureCanvasAgg(fig)
+        for k, panel in enumerate(panels[first_panel:first_panel + per_page]):
+            ax = fig.add_subplot(nrows, ncols, k + 1)
+            for antenna_id in panel:
+                rows = solutions["ANTENNA1"] == antenna_id
+                for pol in range(0, values.shape[2]):
+                    ax.plot(
+                        np.repeat(time_hours[rows], values.shape[1]),
+                        values[rows, :, pol].ravel(),
+                        ".",
+                        markersize=2
+                    )
+            if len(panel) == 1:
+                ax.set_title(antenna_names[panel[0]], fontsize=9)
+            if len(plotrange) == 4:
+                if plotrange[0] != plotrange[1]:
+                    ax.set_xlim(plotrange[0], plotrange[1])
+                if plotrange[2] != plotrange[3]:
+                    ax.set_ylim(plotrange[2], plotrange[3])
+            ax.set_xlabel("Time [h]")
+            ax.set_ylabel(ylabel)
+        fig.tight_layout()
+
+        if page == 0:
+            output_file = figfile_name
+        else:
+            output_file = figfile_name.rpartition(".png")[0] + "_" + str(page) + ".png"
+        fig.savefig(output_file, dpi=100)
+        written_files.append(output_file)
+    return written_files
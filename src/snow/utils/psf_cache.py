@@ -0,0 +1,238 @@
+import glob
+import hashlib
+import os
+import shutil
+from dataclasses import dataclass, field
+from typing import List, Union
+
+import numpy as np
+from casatools import table
+
+from .disk_budget import DiskBudget
+
+tb = table()
+
+# Number of rows read at once when fingerprinting a measurement set
+_ROW_CHUNK = 100000
+
+# Imaging products needed by tclean to skip the PSF calculation with calcpsf=False
+_PSF_PRODUCTS = (".psf", ".sumwt", ".pb", ".weight")
+
+# Number of cached PSFs kept on disk. Each one is a copy of the PSF, primary beam, weight and sum of weights images
+_PSF_CACHE_ENTRIES = 4
+
+_psf_cache = {}
+
+
+@dataclass(init=True, repr=True)
+class UVFingerprint:
+    """
+    Summary of the uv-coverage of a measurement set
+
+    Parameters
+    ----------
+    nrows :
+        Number of rows of the main table
+    uvw_digest :
+        SHA-256 digest of the UVW column
+    flag_fraction :
+        Fraction of flagged visibilities
+    """
+    nrows: int = 0
+    uvw_digest: str = ""
+    flag_fraction: float = 0.0
+
+
+@dataclass(init=True, repr=True)
+class CachedPSF:
+    """
+    PSF products and restoring beam of an image, together with the uv-coverage they were calculated from
+
+    Parameters
+    ----------
+    fingerprint :
+        Fingerprint of the measurement set that was imaged
+    beam :
+        Restoring beam record as returned by the CASA image tool
+    products :
+        Absolute paths to the cached copies of the PSF products
+    """
+    fingerprint: UVFingerprint = None
+    beam: dict = None
+    products: List[str] = field(init=True, repr=True, default_factory=list)
+
+
+def get_uv_fingerprint(ms_name: str = "") -> UVFingerprint:
+    """
+    Function that reads the UVW and FLAG columns of a measurement set in chunks of rows and summarizes them
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+
+    Returns
+    -------
+    UVFingerprint:
+        The fingerprint of the measurement set
+    """
+    sha256 = hashlib.sha256()
+    flagged = 0
+    total = 0
+    tb.open(tablename=ms_name)
+    nrows = tb.nrows()
+    for start in range(0, nrows, _ROW_CHUNK):
+        count = min(_ROW_CHUNK, nrows - start)
+        sha256.update(np.ascontiguousarray(tb.getcol("UVW", startrow=start, nrow=count)).tobytes())
+        flags = tb.getcol("FLAG", startrow=start, nrow=count)
+        flagged += int(np.count_nonzero(flags))
+        total += flags.size
+    tb.close()
+    return UVFingerprint(
+        nrows=nrows,
+        uvw_digest=sha256.hexdigest(),
+        flag_fraction=flagged / total if total > 0 else 0.0
+    )
+
+
+def _cache_key(fingerprint: UVFingerprint = None, imaging_parameters: dict = None) -> str:
+    """
+    Function that returns the cache key of a uv-coverage and a set of imaging parameters
+    """
+    key = [fingerprint.nrows, fingerprint.uvw_digest]
+    key += [(name, repr(imaging_parameters[name])) for name in sorted(imaging_parameters)]
+    return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+def lookup_psf(
+    fingerprint: UVFingerprint = None,
+    imaging_parameters: dict = None,
+    flag_tolerance: float = 0.01
+) -> Union[CachedPSF, None]:
+    """
+    Function that returns the cached PSF of a uv-coverage and a set of imaging parameters
+
+    Parameters
+    ----------
+    fingerprint :
+        Fingerprint of the measurement set to image
+    imaging_parameters :
+        Parameters the PSF depends on, e.g. weighting, robust, cell, M and N
+    flag_tolerance :
+        Largest change of the flagged fraction of visibilities for which the cached PSF is still used
+
+    Returns
+    -------
+    CachedPSF:
+        The cached PSF, or None if there is none or the flags have changed materially
+    """
+    key = _cache_key(fingerprint, imaging_parameters)
+    cached = _psf_cache.get(key)
+    if cached is None:
+        return None
+    if abs(cached.fingerprint.flag_fraction - fingerprint.flag_fraction) > flag_tolerance:
+        return None
+    if not all(os.path.exists(product) for product in cached.products):
+        return None
+    # The most recently used PSFs are evicted last
+    _psf_cache[key] = _psf_cache.pop(key)
+    return cached
+
+
+def store_psf(
+    fingerprint: UVFingerprint = None,
+    imaging_parameters: dict = None,
+    imagename: str = "",
+    beam: dict = None,
+    cache_directory: str = "",
+    max_entries: int = _PSF_CACHE_ENTRIES,
+    disk_budget: DiskBudget = None
+) -> CachedPSF:
+    """
+    Function that copies the PSF products of an image into the cache directory and caches them with its restoring
+    beam. The least recently used PSFs beyond max_entries are deleted, so the cache uses at most max_entries copies
+    of the products.
+
+    Parameters
+    ----------
+    fingerprint :
+        Fingerprint of the measurement set that was imaged
+    imaging_parameters :
+        Parameters the PSF depends on, e.g. weighting, robust, cell, M and N
+    imagename :
+        Image name prefix of the tclean products
+    beam :
+        Restoring beam record
+    cache_directory :
+        Absolute path to the directory where the products are copied
+    max_entries :
+        Maximum number of cached PSFs
+    disk_budget :
+        Disk budget of the run. The cached products are registered to it and unregistered when they are evicted.
+        Default is None, and it means not to track them
+
+    Returns
+    -------
+    CachedPSF:
+        The cached PSF
+    """
+    if max_entries < 1:
+        raise ValueError("Error, the PSF cache needs at least one entry")
+    key = _cache_key(fingerprint, imaging_parameters)
+    if key in _psf_cache:
+        _remove_products(_psf_cache.pop(key), disk_budget)
+    os.makedirs(cache_directory, exist_ok=True)
+    for path in glob.glob(os.path.join(cache_directory, glob.escape(key) + ".*")):
+        shutil.rmtree(path)
+
+    while len(_psf_cache) >= max_entries:
+        _remove_products(_psf_cache.pop(next(iter(_psf_cache))), disk_budget)
+
+    products = []
+    for suffix in _PSF_PRODUCTS:
+        if os.path.exists(imagename + suffix):
+            product = os.path.join(cache_directory, key + suffix)
+            shutil.copytree(imagename + suffix, product, symlinks=True)
+            products.append(product)
+            if disk_budget is not None:
+                disk_budget.register(product, "psf")
+    cached = CachedPSF(fingerprint=fingerprint, beam=beam, products=products)
+    _psf_cache[key] = cached
+    return cached
+
+
+def _remove_products(cached: CachedPSF = None, disk_budget: DiskBudget = None) -> None:
+    """
+    Function that deletes the cached copies of the PSF products of an evicted PSF
+    """
+    for product in cached.products:
+        if os.path.exists(product):
+            shutil.rmtree(product)
+        if disk_budget is not None:
+            disk_budget.unregister(product)
+
+
+def restore_psf_products(cached: CachedPSF = None, imagename: str = "") -> None:
+    """
+    Function that copies the cached PSF products to the products of a new image, so tclean can run with
+    calcpsf=False
+
+    Parameters
+    ----------
+    cached :
+        The cached PSF
+    imagename :
+        Image name prefix of the new tclean products
+    """
+    for product in cached.products:
+        suffix = os.path.splitext(product)[1]
+        if os.path.exists(imagename + suffix):
+            shutil.rmtree(imagename + suffix)
+        shutil.copytree(product, imagename + suffix, symlinks=True)
+
+
+def clear_psf_cache() -> None:
+    """
+    Function that empties the in-memory cache of PSF products. Cached copies on disk are left in place
+    """
+    _psf_cache.clear()
@@ -1,7 +1,10 @@
 import os
 
+import astropy.units as un
 from casatools import table
 
+from .ms_metadata import get_ms_metadata
+
 tb = table()
 
 
@@ -23,9 +26,7 @@ def is_column_in_ms(ms_name: str = "", column_name: str = "") -> bool:
     if ms_name != "":
         if os.path.exists(ms_name):
             # Check if data_column is present in measurement set file
-            tb.open(tablename=ms_name)
-            col_names = tb.colnames()
-            if column_name in col_names:
+            if column_name in get_ms_metadata(ms_name).columns:
                 return True
             else:
                 return False
@@ -35,6 +36,30 @@ def is_column_in_ms(ms_name: str = "", column_name: str = "") -> bool:
         raise ValueError("Measurement Set File cannot be empty")
 
 
+def is_model_in_ms(ms_name: str = "") -> bool:
+    """
+    Function that returns True if model visibilities are present in a Measurement Set file, either as a
+    MODEL_DATA column or as a virtual model
+
+    Parameters
+    ----------
+    ms_name :
+        Measurement set name
+
+    Returns
+    -------
+    True if there is a model column or a virtual model False otherwise
+    """
+    if ms_name != "":
+        if os.path.exists(ms_name):
+            metadata = get_ms_metadata(ms_name)
+            return "MODEL_DATA" in metadata.columns or metadata.virtual_model
+        else:
+            raise FileNotFoundError("The Measurement Set File does not exist")
+    else:
+        raise ValueError("Measurement Set File cannot be empty")
+
+
 def get_table_rows(ms_table: str = "") -> int:
     """
     Function that returns the number of rows of a measurement set table
@@ -50,6 +75,8 @@ def get_table_rows(ms_table: str = "") -> int:
         The number of rows of the measurement set table
 
     """
+    if os.path.isdir(os.path.join(ms_table, "ANTENNA")):
+        return get_ms_metadata(ms_table).nrows
     tb.open(tablename=ms_table)
     rows = tb.nrows()
     tb.close()
@@ -72,12 +99,38 @@ def calculate_number_antennas(ms_name: str = "") -> int:
     """
     if ms_name != "":
         if os.path.exists(ms_name):
-            tb.open(tablename=ms_name + "/ANTENNA")
-            query_table = tb.taql("select NAME from " + ms_name + "/ANTENNA" + " where !FLAG_ROW")
-            nrows = len(query_table.getcol("NAME"))
-            tb.close()
-            return nrows
+            return get_ms_metadata(ms_name).nantennas
         else:
             raise FileNotFoundError("The Measurement Set File does not exist")
     else:
         raise ValueError("Measurement Set File cannot be empty")
+
+
+def solint_to_seconds(solint: str = "", integration_time: float = 0.0) -> float:
+    """
+    Function that converts a CASA solution interval into seconds
+
+    Parameters
+    ----------
+    solint :
+        Solution interval: e.g "inf", "int", "60s", "14min", "1h" or a number of seconds
+    integration_time :
+        Integration time of the measurement set in seconds, used when solint is "int"
+
+    Returns
+    -------
+    float:
+        The solution interval in seconds, or infinity if solint is "inf"
+    """
+    if isinstance(solint, (int, float)):
+        return float(solint)
+    # Frequency intervals such as "60s,16ch" do not change the time interval
+    time_interval = solint.split(",")[0].strip()
+    if time_interval in ("inf", ""):
+        return float("inf")
+    if time_interval == "int":
+        return float(integration_time)
+    try:
+        return float(time_interval)
+    except ValueError:
+        return un.Quantity(time_interval).to(un.s).value
@@ -0,0 +1,357 @@
+import errno
+import fcntl
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from casatools import table
+
+tb = table()
+
+# Linux ioctl request number to clone a file range (FICLONE)
+_FICLONE = 0x40049409
+
+# Files of size above this threshold are copied in parallel ranges
+_CHUNK_SIZE = 256 * 1024 * 1024
+
+# Columns that self-calibration rewrites and must never be shared between snapshots
+_PRIVATE_COLUMNS = (
+    "DATA", "CORRECTED_DATA", "MODEL_DATA", "FLAG", "FLAG_ROW", "FLAG_CATEGORY", "WEIGHT", "SIGMA",
+    "WEIGHT_SPECTRUM", "SIGMA_SPECTRUM"
+)
+
+# Subtables that CASA tasks write to during self-calibration
+_PRIVATE_SUBTABLES = ("HISTORY", "FLAG_CMD", "SOURCE")
+
+# Table control files that casacore rewrites whenever a table is opened or flushed
+_PRIVATE_FILES = ("table.dat", "table.lock", "table.info")
+
+# Directory where the sub-measurement sets of a Multi-MS are stored
+_SUBMS_DIRECTORY = "SUBMSS"
+
+
+def _reflink_file(source: str = "", destination: str = "") -> None:
+    """
+    Function that creates a copy-on-write clone of a file using the FICLONE ioctl
+
+    Parameters
+    ----------
+    source :
+        Absolute path to the source file
+    destination :
+        Absolute path to the destination file
+    """
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+    shutil.copystat(source, destination)
+
+
+def _copy_range(source: str = "", destination: str = "", offset: int = 0, count: int = 0) -> None:
+    """
+    Function that copies a byte range of a file into the same range of a preallocated destination file
+
+    Parameters
+    ----------
+    source :
+        Absolute path to the source file
+    destination :
+        Absolute path to the destination file
+    offset :
+        Byte offset where the range starts
+    count :
+        Number of bytes to copy
+    """
+    src_fd = os.open(source, os.O_RDONLY)
+    dst_fd = os.open(destination, os.O_WRONLY)
+    try:
+        position = offset
+        end = offset + count
+        while position < end:
+            try:
+                written = os.copy_file_range(src_fd, dst_fd, end - position, position, position)
+            except (AttributeError, OSError):
+                buffer = os.pread(src_fd, min(end - position, 16 * 1024 * 1024), position)
+                written = os.pwrite(dst_fd, buffer, position)
+            if written == 0:
+                break
+            position += written
+    finally:
+        os.close(src_fd)
+        os.close(dst_fd)
+
+
+def _private_main_table_files(ms_name: str = "", private_columns: tuple = _PRIVATE_COLUMNS) -> set:
+    """
+    Function that returns the storage manager files of the main table holding columns that are rewritten
+    during self-calibration. If the data manager information cannot be read, every file of the main table
+    is considered private.
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+    private_columns :
+        Columns whose storage manager files need to be private copies
+
+    Returns
+    -------
+    A set with the file names (relative to the measurement set) that have to be copied
+    """
+    main_files = [
+        entry for entry in os.listdir(ms_name)
+        if os.path.isfile(os.path.join(ms_name, entry)) and entry.startswith("table.")
+    ]
+    try:
+        tb.open(tablename=ms_name)
+        dminfo = tb.getdminfo()
+        tb.close()
+    except Exception:
+        return set(main_files)
+
+    private_sequences = set()
+    for manager in dminfo.values():
+        if any(column in private_columns for column in manager["COLUMNS"]):
+            private_sequences.add(manager["SEQNR"])
+
+    private = set()
+    for entry in main_files:
+        match = re.match(r"table\.f(\d+)(_TSM\d+)?$", entry)
+        if match is None:
+            private.add(entry)
+        elif match.group(2) is None:
+            # Tiled storage manager headers are small and rewritten on flush
+            private.add(entry)
+        elif int(match.group(1)) in private_sequences:
+            private.add(entry)
+    return private
+
+
+def _list_files(ms_name: str = "") -> Tuple[List[str], List[str], List[str]]:
+    """
+    Function that lists the directories, files and symbolic links of a measurement set as relative paths.
+    Symbolic links, such as the shared subtables of a Multi-MS, are not followed.
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+
+    Returns
+    -------
+    A tuple with the list of relative directories, the list of relative files and the list of relative
+    symbolic links
+    """
+    directories = []
+    files = []
+    links = []
+    for root, dirnames, filenames in os.walk(ms_name):
+        relative_root = os.path.relpath(root, ms_name)
+        for name in dirnames + filenames:
+            relative_path = os.path.normpath(os.path.join(relative_root, name))
+            if os.path.islink(os.path.join(root, name)):
+                links.append(relative_path)
+            elif name in dirnames:
+                directories.append(relative_path)
+            else:
+                files.append(relative_path)
+    return directories, files, links
+
+
+def _table_roots(ms_name: str = "") -> List[str]:
+    """
+    Function that returns the main tables of a measurement set relative to it: the measurement set itself and, for a
+    Multi-MS, each one of its sub-measurement sets
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+
+    Returns
+    -------
+    A list with the relative paths to the main tables
+    """
+    roots = [""]
+    subms_directory = os.path.join(ms_name, _SUBMS_DIRECTORY)
+    if os.path.isdir(subms_directory):
+        for entry in sorted(os.listdir(subms_directory)):
+            if os.path.isdir(os.path.join(subms_directory, entry)):
+                roots.append(os.path.join(_SUBMS_DIRECTORY, entry))
+    return roots
+
+
+def _is_private(relative_file: str = "", private_main_files: set = None) -> bool:
+    """
+    Function that decides whether a file of a measurement set needs to be a private copy in a snapshot
+
+    Parameters
+    ----------
+    relative_file :
+        File path relative to the measurement set
+    private_main_files :
+        Set of main table files, relative to the measurement set, that have to be copied
+
+    Returns
+    -------
+    True if the file has to be copied, False if it can be shared
+    """
+    parts = relative_file.split(os.sep)
+    if parts[-1] in _PRIVATE_FILES:
+        return True
+    if parts[0] == _SUBMS_DIRECTORY and len(parts) > 2:
+        parts = parts[2:]
+    if len(parts) == 1:
+        return relative_file in private_main_files
+    return parts[0] in _PRIVATE_SUBTABLES
+
+
+def _parallel_copy(jobs: List[Tuple[str, str]], workers: int = None) -> None:
+    """
+    Function that copies a list of files using a thread pool. Large files are split in byte ranges that
+    are copied concurrently.
+
+    Parameters
+    ----------
+    jobs :
+        List of (source, destination) file tuples
+    workers :
+        Number of threads. Default is None, and it means min(32, number of cpus + 4)
+    """
+    ranges = []
+    for source, destination in jobs:
+        size = os.path.getsize(source)
+        with open(destination, "wb") as dst:
+            dst.truncate(size)
+        for offset in range(0, size, _CHUNK_SIZE):
+            ranges.append((source, destination, offset, min(_CHUNK_SIZE, size - offset)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_copy_range, *args) for args in ranges]
+        for future in futures:
+            future.result()
+
+    for source, destination in jobs:
+        shutil.copystat(source, destination)
+
+
+def _probe_reflink(source: str = "", destination: str = "") -> bool:
+    """
+    Function that checks whether the filesystem supports reflink clones between two directories
+
+    Parameters
+    ----------
+    source :
+        Absolute path to an existing file in the source directory
+    destination :
+        Absolute path to a non existing file in the destination directory
+
+    Returns
+    -------
+    True if a clone could be created, False otherwise
+    """
+    try:
+        _reflink_file(source, destination)
+        return True
+    except OSError as e:
+        if os.path.exists(destination):
+            os.remove(destination)
+        if e.errno in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+            return False
+        raise
+
+
+def snapshot_ms(
+    source: str = "",
+    destination: str = "",
+    mode: str = "auto",
+    workers: int = None,
+    private_columns: tuple = _PRIVATE_COLUMNS
+) -> str:
+    """
+    Function that creates a snapshot of a measurement set. Depending on the mode and on what the filesystem
+    supports, the snapshot is created using copy-on-write reflink clones, hardlinks of the table files that
+    are not modified during self-calibration, or a multi-threaded copy. Symbolic links are recreated as they are,
+    so the sub-measurement sets of a Multi-MS keep sharing their subtables in the snapshot.
+
+    Parameters
+    ----------
+    source :
+        Absolute path to the measurement set to snapshot
+    destination :
+        Absolute path to the output measurement set. It must not exist
+    mode :
+        Snapshot strategy: "auto", "reflink", "hardlink" or "copy". "auto" tries reflink clones first, then
+        hardlinks and finally falls back to a parallel copy
+    workers :
+        Number of threads of the parallel copier
+    private_columns :
+        Main table columns whose storage manager files are always copied when hardlinking
+
+    Returns
+    -------
+    str:
+        The strategy that was used to create the snapshot
+    """
+    if mode not in ("auto", "reflink", "hardlink", "copy"):
+        raise ValueError("Snapshot mode {0} is not supported".format(mode))
+    if not os.path.isdir(source):
+        raise FileNotFoundError("The Measurement Set File {0} does not exist".format(source))
+    if os.path.exists(destination):
+        raise FileExistsError("The snapshot destination {0} already exists".format(destination))
+
+    directories, files, links = _list_files(source)
+    os.makedirs(destination)
+    for directory in directories:
+        os.makedirs(os.path.join(destination, directory), exist_ok=True)
+    for link in links:
+        os.symlink(os.readlink(os.path.join(source, link)), os.path.join(destination, link))
+
+    strategy = mode
+    if mode in ("auto", "reflink"):
+        if files and _probe_reflink(os.path.join(source, files[0]),
+                                    os.path.join(destination, files[0])):
+            strategy = "reflink"
+            for relative_file in files[1:]:
+                _reflink_file(
+                    os.path.join(source, relative_file), os.path.join(destination, relative_file)
+                )
+        elif mode == "reflink":
+            shutil.rmtree(destination)
+            raise OSError(
+                errno.EOPNOTSUPP, "Reflink clones are not supported for {0}".format(destination)
+            )
+        else:
+            strategy = "hardlink" if os.stat(source).st_dev == os.stat(
+                destination
+            ).st_dev else "copy"
+
+    if strategy == "reflink":
+        shutil.copystat(source, destination)
+        return strategy
+
+    to_copy = []
+    if strategy == "hardlink":
+        private_main_files = set()
+        for root in _table_roots(source):
+            private_main_files.update(
+                os.path.normpath(os.path.join(root, entry)) for entry in
+                _private_main_table_files(os.path.join(source, root), private_columns)
+            )
+        for relative_file in files:
+            src = os.path.join(source, relative_file)
+            dst = os.path.join(destination, relative_file)
+            if _is_private(relative_file, private_main_files):
+                to_copy.append((src, dst))
+            else:
+                os.link(src, dst)
+    else:
+        to_copy = [
+            (os.path.join(source, relative_file), os.path.join(destination, relative_file))
+            for relative_file in files
+        ]
+
+    _parallel_copy(to_copy, workers)
+    shutil.copystat(source, destination)
+    return strategy
@@ -0,0 +1,165 @@
+import json
+import os
+import resource
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List
+
+
+def _cpu_time() -> float:
+    """
+    Function that returns the CPU time of this process and its finished children in seconds
+    """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _bytes_written() -> int:
+    """
+    Function that returns the number of bytes written to disk by this process and its finished children.
+    On Linux the storage layer counter of /proc/self/io is used, otherwise the number of block output
+    operations reported by getrusage.
+    """
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_oublock * 512
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                if line.startswith("write_bytes:"):
+                    return int(line.split()[1]) + children
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_oublock * 512 + children
+
+
+@dataclass(init=True, repr=True)
+class Span:
+    """
+    Timing record of a traced stage
+
+    Parameters
+    ----------
+    name :
+        Name of the stage
+    iteration :
+        Self-calibration iteration of the stage if any
+    wall_time :
+        Elapsed wall time in seconds
+    cpu_time :
+        CPU time in seconds
+    bytes_written :
+        Bytes written to disk
+    """
+    name: str = ""
+    iteration: int = None
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    bytes_written: int = 0
+
+
+@dataclass(init=True, repr=True)
+class Tracer:
+    """
+    Object that records the wall time, CPU time and bytes written to disk of the stages of a run
+
+    Parameters
+    ----------
+    spans :
+        List of recorded spans
+    """
+    spans: List[Span] = field(init=True, repr=False, default_factory=list)
+
+    @contextmanager
+    def span(self, name: str = "", iteration: int = None):
+        """
+        Context manager that records a span around the enclosed code. Spans can be nested, in which case
+        the time of the inner span is also accounted in the outer one.
+
+        Parameters
+        ----------
+        name :
+            Name of the stage
+        iteration :
+            Self-calibration iteration of the stage if any
+        """
+        start_wall = time.perf_counter()
+        start_cpu = _cpu_time()
+        start_bytes = _bytes_written()
+        try:
+            yield
+        finally:
+            self.spans.append(
+                Span(
+                    name=name,
+                    iteration=iteration,
+                    wall_time=time.perf_counter() - start_wall,
+                    cpu_time=_cpu_time() - start_cpu,
+                    bytes_written=_bytes_written() - start_bytes
+                )
+            )
+
+    def summary(self) -> dict:
+        """
+        Method that aggregates the recorded spans by stage name
+
+        Returns
+        -------
+        dict:
+            A dictionary with the number of calls, wall time, CPU time and bytes written of each stage
+        """
+        stages = {}
+        for span in self.spans:
+            stage = stages.setdefault(
+                span.name, {
+                    "calls": 0,
+                    "wall_time": 0.0,
+                    "cpu_time": 0.0,
+                    "bytes_written": 0
+                }
+            )
+            stage["calls"] += 1
+            stage["wall_time"] += span.wall_time
+            stage["cpu_time"] += span.cpu_time
+            stage["bytes_written"] += span.bytes_written
+        return stages
+
+    def report(self) -> str:
+        """
+        Method that returns a human-readable table of the stages sorted by wall time
+
+        Returns
+        -------
+        str:
+            The table as a string
+        """
+        lines = [
+            "{0:<20} {1:>6} {2:>12} {3:>12} {4:>14}".format(
+                "Stage", "Calls", "Wall [s]", "CPU [s]", "Written [MB]"
+            )
+        ]
+        stages = sorted(self.summary().items(), key=lambda item: item[1]["wall_time"], reverse=True)
+        for name, stage in stages:
+            lines.append(
+                "{0:<20} {1:>6d} {2:>12.3f} {3:>12.3f} {4:>14.3f}".format(
+                    name, stage["calls"], stage["wall_time"], stage["cpu_time"],
+                    stage["bytes_written"] / 1024.0**2
+                )
+            )
+        return "\n".join(lines)
+
+    def to_json(self, json_file: str = "") -> None:
+        """
+        Method that writes the recorded spans and their summary to a JSON file
+
+        Parameters
+        ----------
+        json_file :
+            Absolute path to the output JSON file
+        """
+        with open(json_file, "w") as f:
+            json.dump(
+                {
+                    "summary": self.summary(),
+                    "spans": [vars(span) for span in self.spans]
+                }, f, indent=2
+            )
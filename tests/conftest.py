@@ -0,0 +1,59 @@
+import os
+import shutil
+
+import pytest
+
+
+@pytest.fixture
+def casa(monkeypatch):
+    """
+    Replaces the CASA tasks used by the self-calibration loop with functions that copy directories and record the
+    applied calibration tables
+    """
+    from fakes import CasaRecorder
+    from snow.selfcalibration import selfcal as selfcal_module
+
+    recorder = CasaRecorder()
+
+    def run_on_subms(task, vis, workers=None, **kwargs):
+        recorder.tasks.append((task, vis))
+        if task == "applycal":
+            recorder.applied.append((vis, list(kwargs["gaintable"])))
+
+    def rmtables(tablename):
+        if os.path.exists(tablename):
+            shutil.rmtree(tablename)
+
+    def snapshot_ms(source, destination, mode="auto", workers=None):
+        shutil.copytree(source, destination, symlinks=True)
+        return "copy"
+
+    def mstransform(vis="", outputvis="", **kwargs):
+        shutil.copytree(vis, outputvis)
+
+    monkeypatch.setattr(selfcal_module, "run_on_subms", run_on_subms)
+    monkeypatch.setattr(selfcal_module, "rmtables", rmtables)
+    monkeypatch.setattr(selfcal_module, "snapshot_ms", snapshot_ms)
+    def split(vis="", outputvis="", **kwargs):
+        recorder.tasks.append(("split", vis, outputvis))
+        os.makedirs(outputvis)
+
+    def statwt(vis="", **kwargs):
+        recorder.tasks.append(("statwt", vis))
+
+    monkeypatch.setattr(selfcal_module, "mstransform", mstransform)
+    monkeypatch.setattr(selfcal_module, "split", split)
+    monkeypatch.setattr(selfcal_module, "statwt", statwt)
+    monkeypatch.setattr(selfcal_module, "is_mms", lambda vis: False)
+    monkeypatch.setattr(selfcal_module, "flagmanager", lambda **kwargs: None)
+    monkeypatch.setattr(selfcal_module, "clearcal", lambda *args, **kwargs: None)
+    monkeypatch.setattr(selfcal_module, "delmod", lambda **kwargs: None)
+    return recorder
+
+
+@pytest.fixture
+def visfile(tmp_path):
+    ms_name = tmp_path / "obs.ms"
+    ms_name.mkdir()
+    (ms_name / "table.f0").write_bytes(b"\1" * 65536)
+    return str(ms_name)
@@ -0,0 +1,113 @@
+import os
+import pickle
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from snow.imaging.imager import Imager
+from snow.selfcalibration.selfcal import Selfcal
+
+
+@dataclass(init=False, repr=True)
+class ScriptedImager(Imager):
+    """
+    Imager that returns a scripted sequence of PSNR values instead of imaging, creates an empty restored image and
+    records the measurement set imaged on each run
+    """
+
+    def __init__(self, psnrs: list = None, **kwargs):
+        super().__init__(**kwargs)
+        self.psnrs = list(psnrs)
+        self.runs = []
+
+    def run(self, imagename=""):
+        os.makedirs(imagename + ".image", exist_ok=True)
+        self.runs.append((imagename, self.inputvis))
+        self.psnr = self.psnrs.pop(0)
+        self.peak = self.psnr
+        self.stdv = 1.0
+
+
+@dataclass(init=False, repr=True)
+class ToySelfcal(Selfcal):
+    """
+    Phase self-calibration whose solves only create the calibration table directory
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._calmode = "p"
+        self._loops = len(self.solint)
+
+    def _caltable_name(self, current_iteration: int = 0) -> str:
+        return self.output_caltables + "pcal" + str(current_iteration)
+
+    def _flag_version_name(self, current_iteration: int = 0) -> str:
+        return "before_phasecal_" + str(current_iteration)
+
+    def _solve(self, caltable: str = "", solint: str = "") -> None:
+        os.makedirs(caltable)
+
+    def _apply(self, caltable: str = "") -> None:
+        self._applycal(gaintable=[caltable], spwmap=self.spwmap)
+
+    def _start_run(self) -> None:
+        self._save_selfcal(caltable_version="before_selfcal", overwrite=True)
+        self._caltables_versions.append("before_selfcal")
+        self._init_run("_original")
+
+    def _ismodel_in_dataset(self) -> bool:
+        return False
+
+    def run(self, resume: bool = False):
+        self._run_iterations(*self._prepare_run(resume))
+        self._finish_run()
+
+
+class CasaRecorder:
+    """
+    Records the tasks run by the mocked CASA tasks and the calibration tables applied to each measurement set
+    """
+
+    def __init__(self):
+        self.applied = []
+        self.tasks = []
+
+    def last_applied(self, visfile: str = "") -> list:
+        chains = [gaintable for vis, gaintable in self.applied if vis == visfile]
+        return chains[-1] if chains else None
+
+
+class SerialExecutor:
+    """
+    Executor that runs the submitted functions one after the other on pickled copies of their arguments, as the
+    worker processes of a process pool would
+    """
+
+    def __init__(self, max_workers=None, mp_context=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def submit(self, function, *args):
+        future = Future()
+        try:
+            future.set_result(function(*pickle.loads(pickle.dumps(args))))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def make_selfcal(tmp_path, visfile, psnrs, **kwargs) -> ToySelfcal:
+    imager = ScriptedImager(psnrs=psnrs, output=str(tmp_path / "img"))
+    return ToySelfcal(
+        visfile=visfile,
+        imager=imager,
+        output_caltables=str(tmp_path) + os.sep,
+        want_plot=False,
+        restore_psnr=True,
+        **kwargs
+    )
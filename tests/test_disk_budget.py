@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("casatasks")
+
+from fakes import make_selfcal
+from snow.utils.disk_budget import DiskBudget, get_disk_usage
+
+
+def test_estimate_ignores_setup_artifacts(tmp_path, visfile):
+    disk = DiskBudget(budget=int(1.5 * get_disk_usage(visfile)))
+    disk.register(visfile, "ms")
+    caltable = tmp_path / "pcal0"
+    caltable.mkdir()
+    (caltable / "table.f0").write_bytes(b"\0" * 512)
+    disk.register(str(caltable), "caltable", 0)
+
+    assert disk.estimate() == disk.iteration_usage()[0]
+    disk.check(disk.estimate())
+
+
+def test_budget_between_one_and_two_measurement_sets(tmp_path, visfile, casa):
+    selfcal = make_selfcal(
+        tmp_path,
+        visfile,
+        [1.0, 2.0, 3.0],
+        solint=["inf", "60s"],
+        rollback_mode="flagversions",
+        disk_budget=int(1.5 * get_disk_usage(visfile))
+    )
+    selfcal.run()
+
+    assert selfcal._caltables == [selfcal._caltable_name(0), selfcal._caltable_name(1)]
@@ -0,0 +1,42 @@
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip("casatools")
+
+from snow.utils import ms_metadata
+from snow.utils.disk_budget import DiskBudget
+
+
+@pytest.fixture
+def read_metadata(monkeypatch):
+    reads = []
+
+    def _read_metadata(ms_name=""):
+        reads.append(ms_name)
+        return ms_metadata.MSMetadata(ms_name=ms_name, stamps=ms_metadata._table_stamps(ms_name))
+
+    monkeypatch.setattr(ms_metadata, "_read_metadata", _read_metadata)
+    ms_metadata.clear_ms_metadata_cache()
+    yield reads
+    ms_metadata.clear_ms_metadata_cache()
+
+
+def test_sidecar_is_removed_and_counted_with_the_measurement_set(visfile, read_metadata):
+    ms_metadata.get_ms_metadata(visfile)
+    sidecar_file = ms_metadata._sidecar_file(visfile)
+    assert os.path.dirname(sidecar_file) == visfile
+    assert os.path.exists(sidecar_file)
+
+    disk = DiskBudget()
+    disk.register(visfile, "ms")
+    assert disk.usage() == sum(
+        os.stat(os.path.join(visfile, name)).st_blocks * 512 for name in os.listdir(visfile)
+    )
+
+    shutil.rmtree(visfile)
+    os.makedirs(visfile)
+    ms_metadata.clear_ms_metadata_cache()
+    ms_metadata.get_ms_metadata(visfile)
+    assert read_metadata == [visfile, visfile]
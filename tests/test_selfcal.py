@@ -0,0 +1,115 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("casatasks")
+
+from fakes import SerialExecutor, make_selfcal
+
+
+def test_copy_rollback_after_accepted_iteration(tmp_path, visfile, casa):
+    selfcal = make_selfcal(
+        tmp_path, visfile, [1.0, 2.0, 1.5], solint=["inf", "60s", "30s"], rollback_mode="copy"
+    )
+    selfcal.run()
+
+    first_caltable = selfcal._caltable_name(0)
+    assert selfcal.visfile == str(tmp_path / "obs_p0.ms")
+    assert selfcal._caltables == [first_caltable]
+    assert selfcal._psnr_history == [1.0, 2.0]
+    assert [chain["gaintable"] for chain in selfcal._gaintable_chains] == [[first_caltable]]
+
+    with open(selfcal._checkpoint_file()) as f:
+        state = json.load(f)
+    assert [chain["gaintable"] for chain in state["gaintable_chains"]] == [[first_caltable]]
+
+    following = make_selfcal(tmp_path, visfile, [], solint=["inf"])
+    following._handover(selfcal)
+    assert following._input_chain["gaintable"] == [first_caltable]
+    assert [chain["gaintable"] for chain in following._gaintable_chains] == [[first_caltable]]
+
+
+def test_flagversions_rollback_after_accepted_iteration(tmp_path, visfile, casa):
+    selfcal = make_selfcal(
+        tmp_path,
+        visfile,
+        [1.0, 2.0, 1.5],
+        solint=["inf", "60s", "30s"],
+        rollback_mode="flagversions"
+    )
+    selfcal.run()
+
+    first_caltable = selfcal._caltable_name(0)
+    assert selfcal._caltables == [first_caltable]
+    assert [chain["gaintable"] for chain in selfcal._gaintable_chains] == [[first_caltable]]
+    assert casa.last_applied(selfcal.visfile) == [first_caltable]
+
+
+def test_proxy_rejected_last_iteration(tmp_path, visfile, casa):
+    selfcal = make_selfcal(
+        tmp_path,
+        visfile,
+        [1.0, 2.0, 1.5],
+        solint=["inf", "60s", "30s"],
+        rollback_mode="copy",
+        proxy_average=True,
+        proxy_timebin="10s"
+    )
+    selfcal.run()
+
+    first_caltable = selfcal._caltable_name(0)
+    full_visfile = str(tmp_path / "obs_p0.ms")
+    assert selfcal.visfile == full_visfile
+    assert selfcal._full_visfile is None
+    assert casa.last_applied(full_visfile) == [first_caltable]
+
+
+def test_selfcal_output_reweights_multi_ms_in_parallel(tmp_path, visfile, casa, monkeypatch):
+    from snow.selfcalibration import selfcal as selfcal_module
+
+    monkeypatch.setattr(selfcal_module, "is_mms", lambda vis: True)
+    monkeypatch.setattr(selfcal_module, "is_column_in_ms", lambda vis, column: True)
+    selfcal = make_selfcal(tmp_path, visfile, [], solint=["inf"])
+    output_vis = visfile + ".selfcal"
+    statwt_path = output_vis + ".statwt"
+    # A previous output is always replaced
+    (tmp_path / "obs.ms.selfcal.statwt").mkdir()
+
+    assert selfcal.selfcal_output(overwrite=True, _statwt=True) == output_vis
+
+    splits = [task for task in casa.tasks if task[0] == "split"]
+    assert [task[1] for task in splits] == [visfile, output_vis + ".mms", output_vis + ".mms"]
+    assert [task[2] for task in splits[1:]] == [output_vis, statwt_path]
+    assert ("statwt", output_vis + ".mms") in casa.tasks
+    assert not (tmp_path / "obs.ms.selfcal.mms").exists()
+
+
+def test_selfcal_output_snapshots_the_split_output(tmp_path, visfile, casa, monkeypatch):
+    from snow.selfcalibration import selfcal as selfcal_module
+
+    monkeypatch.setattr(selfcal_module, "is_column_in_ms", lambda vis, column: True)
+    selfcal = make_selfcal(tmp_path, visfile, [], solint=["inf"])
+    output_vis = visfile + ".selfcal"
+    (tmp_path / "obs.ms.selfcal.statwt").mkdir()
+
+    selfcal.selfcal_output(overwrite=True, _statwt=True)
+
+    assert [task for task in casa.tasks if task[0] == "split"] == [("split", visfile, output_vis)]
+    assert ("statwt", output_vis + ".statwt") in casa.tasks
+
+
+def test_search_deletes_losing_candidates(tmp_path, visfile, casa, monkeypatch):
+    from snow.selfcalibration import selfcal as selfcal_module
+
+    monkeypatch.setattr(selfcal_module, "ProcessPoolExecutor", SerialExecutor)
+    selfcal = make_selfcal(tmp_path, visfile, [1.0, 2.0], solint=["inf", "60s"])
+
+    results = selfcal.search([{"solint": "inf"}, {"solint": "60s"}])
+
+    winner, loser = results
+    assert selfcal.visfile == winner["visfile"]
+    assert selfcal._caltables == [winner["caltable"]]
+    assert os.path.exists(winner["imagename"] + ".image")
+    for path in (loser["visfile"], loser["caltable"], loser["imagename"] + ".image"):
+        assert not os.path.exists(path)